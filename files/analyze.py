@@ -0,0 +1,270 @@
+import argparse
+import bisect
+import heapq
+import json
+import math
+import multiprocessing as mp
+import os
+import sys
+import time
+
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import main
+
+# ---------------------------------------
+# Solvability analysis
+# ---------------------------------------
+# Builds a jump-reachability graph between platforms from a precomputed jump
+# arc and searches for the earliest route to the door, rejecting any landing
+# the lava has already reached. The arc steps exactly like the game at SIM_HZ
+# (gravity then int(vely) per tick). Head bumps on platforms above the arc
+# are not modelled, so reachability is an optimistic bound.
+#
+# A single jump rises 124 px while rows are 160-180 px apart, so the levels
+# rely on buffered air jumps: Player.try_jump accepts a fresh press while the
+# jump buffer from the previous press is still running. Arcs with up to
+# `air_jumps` re-jumps at each apex are precomputed and the fewest that land
+# is used for every edge.
+
+MAX_DROP = 1200
+MAX_AIR_JUMPS = 3
+DT = main.SIM_DT
+
+def jump_arc(air_jumps):
+    # offset of the player's bottom from the takeoff height after each frame,
+    # and whether that frame was falling
+    offsets = [0]
+    falling = [False]
+    vely = main.JUMP_VEL
+    off = 0
+    left = air_jumps
+    while off < MAX_DROP:
+        if left and vely + main.GRAVITY >= 0:
+            vely = main.JUMP_VEL
+            left -= 1
+        vely = main.clamp(vely + main.GRAVITY, -50, 30)
+        off += int(vely)
+        offsets.append(off)
+        falling.append(vely > 0)
+    return offsets, falling
+
+class Arc:
+    def __init__(self, air_jumps):
+        self.air_jumps = air_jumps
+        self.offsets, self.falling = jump_arc(air_jumps)
+        self.max_rise = -min(self.offsets)
+        self.peak_frame = self.offsets.index(-self.max_rise)
+        self.landings = {}
+
+    def landing(self, rise):
+        # first falling frame whose bottom drops past a platform `rise` px
+        # above the takeoff height, or None if the arc never gets there
+        t = self.landings.get(rise, -1)
+        if t != -1:
+            return t
+        t = None
+        if rise < self.max_rise:
+            for k in range(1, len(self.offsets)):
+                if self.falling[k] and self.offsets[k] > -rise:
+                    t = k
+                    break
+        self.landings[rise] = t
+        return t
+
+ARCS = [Arc(k) for k in range(MAX_AIR_JUMPS + 1)]
+
+def landing(rise, air_jumps):
+    # (frames, arc) of the arc with the fewest air jumps that lands `rise` up
+    for arc in ARCS[: air_jumps + 1]:
+        t = arc.landing(rise)
+        if t is not None:
+            return t, arc
+    return None, None
+
+def lava_at(level, frames):
+    # closed form of Level.update at the fixed tick rate: speed is multiplied by
+    # lava_accel before every move
+    a = level.lava_accel
+    s0 = level.lava_speed * DT
+    if a == 1.0:
+        return level.lava_y - s0 * frames
+    return level.lava_y - s0 * a * (a ** frames - 1.0) / (a - 1.0)
+
+def standable(rect):
+    # range of player.rect.x that still overlaps the rect
+    return rect.left - main.PLAYER_W + 1, rect.right - 1
+
+def gap(a, b):
+    return max(0, b[0] - a[1], a[0] - b[1])
+
+def analyze(level, air_jumps=MAX_AIR_JUMPS):
+    plats = sorted(level.platforms, key=lambda p: p.rect.top)
+    tops = [p.rect.top for p in plats]
+    spans = [standable(p.rect) for p in plats]
+    ground = max(range(len(plats)), key=lambda i: plats[i].rect.top)
+    door = level.door.rect
+    door_span = standable(door)
+
+    top_arc = ARCS[air_jumps]
+    best = {ground: 0}
+    prev = {}
+    heap = [(0, ground)]
+    hardest = {ground: 0.0}
+    most_air = {ground: 0}
+    goal = None
+    while heap:
+        t, i = heapq.heappop(heap)
+        if t > best.get(i, math.inf):
+            continue
+        a = plats[i].rect
+        # door: touching it is enough, so the player's rect only has to
+        # overlap it at some point of a jump (or while standing)
+        need_rise = a.top - door.bottom - main.PLAYER_H + 1
+        if need_rise < top_arc.max_rise:
+            rise_frames = top_arc.peak_frame if need_rise > 0 else 0
+            dx = gap(spans[i], door_span)
+            if dx <= main.PLAYER_SPEED * 2 * rise_frames or dx == 0:
+                walk = math.ceil(abs(door.centerx - a.centerx) / main.PLAYER_SPEED)
+                goal = (t + max(rise_frames, walk), i)
+                break
+        lo = bisect.bisect_left(tops, a.top - top_arc.max_rise + 1)
+        hi = bisect.bisect_right(tops, a.top + MAX_DROP)
+        for j in range(lo, hi):
+            if j == i:
+                continue
+            b = plats[j].rect
+            t_land, arc = landing(a.top - b.top, air_jumps)
+            if t_land is None:
+                continue
+            dx = gap(spans[i], spans[j])
+            reach = main.PLAYER_SPEED * t_land
+            if dx > reach:
+                continue
+            walk = math.ceil(abs(b.centerx - a.centerx) / main.PLAYER_SPEED)
+            arrive = t + max(t_land, walk)
+            # the player dies if their bottom is below the lava on landing
+            if b.top > lava_at(level, arrive):
+                continue
+            if arrive < best.get(j, math.inf):
+                best[j] = arrive
+                prev[j] = i
+                hardest[j] = max(hardest[i], dx / reach if reach else 0.0)
+                most_air[j] = max(most_air[i], arc.air_jumps)
+                heapq.heappush(heap, (arrive, j))
+
+    result = {
+        "solvable": goal is not None,
+        "platforms": len(plats),
+        "saws": len(level.saws) + len(level.moving_saws),
+        "cannons": len(level.cannons),
+        "reached": len(best),
+    }
+    if goal is None:
+        return result
+    frames, last = goal
+    path = [last]
+    while path[-1] in prev:
+        path.append(prev[path[-1]])
+    # slack at each landing, the ground start is not a landing
+    landed = path[:-1] or path
+    slack = min(lava_at(level, best[k]) - plats[k].rect.top for k in landed)
+    result.update(
+        {
+            "jumps": len(path),
+            "seconds": frames * DT,
+            "lava_slack": slack,
+            "hardest_jump": hardest[last],
+            "air_jumps": most_air[last],
+        }
+    )
+    return result
+
+def analyze_seed(task):
+    idx, seed, air_jumps = task
+    result = analyze(main.Level(idx, seed), air_jumps)
+    result["level"] = idx
+    result["seed"] = seed
+    return result
+
+def stats(values):
+    if not values:
+        return {}
+    values = sorted(values)
+    n = len(values)
+    return {
+        "mean": sum(values) / n,
+        "min": values[0],
+        "p50": values[n // 2],
+        "p90": values[min(n - 1, int(n * 0.9))],
+        "max": values[-1],
+    }
+
+def summarize(results):
+    report = {}
+    for idx in sorted({r["level"] for r in results}):
+        rows = [r for r in results if r["level"] == idx]
+        solved = [r for r in rows if r["solvable"]]
+        report[f"level{idx + 1}"] = {
+            "seeds": len(rows),
+            "solvable": len(solved),
+            "unsolvable": len(rows) - len(solved),
+            "unsolvable_seeds": sorted(r["seed"] for r in rows if not r["solvable"])[:20],
+            "jumps": stats([r["jumps"] for r in solved]),
+            "seconds": stats([r["seconds"] for r in solved]),
+            "lava_slack": stats([r["lava_slack"] for r in solved]),
+            "hardest_jump": stats([r["hardest_jump"] for r in solved]),
+            "air_jumps": stats([r["air_jumps"] for r in solved]),
+            "hazards": stats([r["saws"] + r["cannons"] for r in rows]),
+        }
+    return report
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Sweep level seeds for solvability")
+    parser.add_argument("--seeds", type=int, default=1000, help="seeds per level")
+    parser.add_argument("--first-seed", type=int, default=0)
+    parser.add_argument("--levels", type=int, nargs="*", default=[0, 1, 2])
+    parser.add_argument(
+        "--air-jumps",
+        type=int,
+        default=MAX_AIR_JUMPS,
+        choices=range(MAX_AIR_JUMPS + 1),
+        help="buffered re-jumps allowed per jump",
+    )
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--out", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    tasks = [
+        (idx, seed, args.air_jumps)
+        for idx in args.levels
+        for seed in range(args.first_seed, args.first_seed + args.seeds)
+    ]
+    t0 = time.perf_counter()
+    if args.workers > 1:
+        with mp.Pool(args.workers) as pool:
+            results = list(pool.imap_unordered(analyze_seed, tasks, chunksize=32))
+    else:
+        results = [analyze_seed(t) for t in tasks]
+    elapsed = time.perf_counter() - t0
+
+    report = {
+        "seeds_per_second": len(tasks) / elapsed,
+        "workers": args.workers,
+        "levels": summarize(results),
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    for name, lv in report["levels"].items():
+        print(
+            f"{name}: {lv['solvable']}/{lv['seeds']} solvable, "
+            f"{len(tasks) / elapsed:.0f} seeds/s",
+            file=sys.stderr,
+        )
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,281 @@
+import argparse
+import heapq
+import multiprocessing as mp
+import os
+import time
+from multiprocessing import shared_memory
+
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import main
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# ---------------------------------------
+# Batched environments
+# ---------------------------------------
+# Steps N independent simulations split across worker processes. Actions,
+# observations, rewards and done flags live in shared memory, so a step only
+# sends a one-word command down each worker's pipe instead of pickling state.
+#
+# observation row: player x, y, w, h, velx, vely, on_ground, lava_y, then
+# (dx, dy, r) of the NEAR_HAZARDS closest saws and projectiles relative to
+# the player centre (r == 0 marks an empty slot)
+# action: Inputs.flags() bits (1 left, 2 right, 4 jump held, 8 jump pressed)
+
+NEAR_HAZARDS = 4
+NEAR_RANGE = 400
+OBS_DIM = 8 + 3 * NEAR_HAZARDS
+MAX_STEPS = 60 * 120
+
+INPUTS = [main.Inputs.from_flags(f) for f in range(16)]
+
+class EnvSlot:
+    # one simulation plus the bookkeeping its reward needs
+    def __init__(self, level_idx, seed, max_steps):
+        self.level_idx = level_idx
+        self.seed = seed
+        self.max_steps = max_steps
+        self.reset()
+
+    def reset(self):
+        self.sim = main.Simulation()
+        self.sim.start_level(self.level_idx, self.seed)
+        self.best_y = self.sim.player.rect.y
+        self.stage = self.sim.level_idx
+        self.lives = self.sim.lives
+        self.steps = 0
+
+    def step(self, flags):
+        sim = self.sim
+        sim.step(INPUTS[flags & 15])
+        self.steps += 1
+        reward = 0.0
+        if sim.level_idx != self.stage or sim.state == main.STATE_WIN:
+            # reached a door: the next level starts with its own lives
+            reward += 10.0
+            self.stage = sim.level_idx
+            self.lives = sim.lives
+            if sim.state == main.STATE_PLAY:
+                self.best_y = sim.player.rect.y
+        else:
+            y = sim.player.rect.y
+            if y < self.best_y:
+                reward += (self.best_y - y) / 100.0
+                self.best_y = y
+            if sim.lives < self.lives:
+                reward -= 1.0
+            self.lives = sim.lives
+        done = sim.state != main.STATE_PLAY or self.steps >= self.max_steps
+        return reward, done
+
+    def observe(self, out, base):
+        p = self.sim.player
+        lvl = self.sim.level
+        r = p.rect
+        out[base] = r.x
+        out[base + 1] = r.y
+        out[base + 2] = r.w
+        out[base + 3] = r.h
+        out[base + 4] = p.velx
+        out[base + 5] = p.vely
+        out[base + 6] = p.on_ground
+        out[base + 7] = lvl.lava_y
+
+        cx, cy = r.centerx, r.centery
+        top, bottom = cy - NEAR_RANGE, cy + NEAR_RANGE
+        near = []
+        for s in lvl.saw_grid.query(top, bottom) + lvl.moving_saws_in(top, bottom):
+            near.append((s.x - cx, s.y - cy, s.r))
+        pool = lvl.projectiles
+        for i in range(pool.n):
+            if top <= pool.y[i] <= bottom:
+                near.append((pool.x[i] - cx, pool.y[i] - cy, pool.r[i]))
+        closest = heapq.nsmallest(NEAR_HAZARDS, near, key=lambda h: h[0] * h[0] + h[1] * h[1])
+        k = base + 8
+        for dx, dy, hr in closest:
+            out[k] = dx
+            out[k + 1] = dy
+            out[k + 2] = hr
+            k += 3
+        while k < base + OBS_DIM:
+            out[k] = 0.0
+            k += 1
+
+def run_slots(slots, lo, command, actions, obs, rewards, dones):
+    # auto-reset: a finished env reports its reward and done flag for the
+    # step, then its observation row already shows the fresh episode
+    for j, slot in enumerate(slots):
+        i = lo + j
+        if command == "reset":
+            slot.reset()
+            rewards[i] = 0.0
+            dones[i] = 0
+        else:
+            reward, done = slot.step(actions[i])
+            rewards[i] = reward
+            dones[i] = done
+            if done:
+                slot.reset()
+        slot.observe(obs, i * OBS_DIM)
+
+def worker(conn, blocks, lo, hi, config):
+    views = BatchEnv.views(blocks)
+    slots = [EnvSlot(config["level_idx"], config["seeds"][i], config["max_steps"])
+             for i in range(lo, hi)]
+    try:
+        while True:
+            command = conn.recv()
+            if command == "close":
+                break
+            run_slots(slots, lo, command, *views)
+            conn.send(True)
+    finally:
+        for v in views:
+            v.release()
+        conn.close()
+
+class BatchEnv:
+    def __init__(
+        self,
+        n_envs,
+        workers=None,
+        level_idx=0,
+        seed=None,
+        max_steps=MAX_STEPS,
+    ):
+        if workers is None:
+            workers = min(n_envs, os.cpu_count() or 1)
+        base = 100 + level_idx * 7 if seed is None else seed
+        self.n_envs = n_envs
+        self.config = {
+            "level_idx": level_idx,
+            "seeds": [base + i for i in range(n_envs)],
+            "max_steps": max_steps,
+        }
+        sizes = {"actions": n_envs, "obs": 8 * n_envs * OBS_DIM, "rewards": 8 * n_envs,
+                 "dones": n_envs}
+        self.blocks = {
+            name: shared_memory.SharedMemory(create=True, size=max(1, size))
+            for name, size in sizes.items()
+        }
+        self.actions, self.obs, self.rewards, self.dones = self.views(self.blocks)
+
+        self.procs = []
+        self.conns = []
+        self.local = None
+        if workers <= 0:
+            self.local = [
+                EnvSlot(level_idx, self.config["seeds"][i], max_steps) for i in range(n_envs)
+            ]
+            return
+        # fork hands the shared memory objects straight to the children;
+        # elsewhere they are re-attached by name
+        methods = mp.get_all_start_methods()
+        ctx = mp.get_context("fork" if "fork" in methods else None)
+        bounds = [n_envs * k // workers for k in range(workers + 1)]
+        for lo, hi in zip(bounds, bounds[1:]):
+            if lo == hi:
+                continue
+            parent, child = ctx.Pipe()
+            proc = ctx.Process(
+                target=worker, args=(child, self.blocks, lo, hi, self.config), daemon=True
+            )
+            proc.start()
+            child.close()
+            self.procs.append(proc)
+            self.conns.append(parent)
+
+    @staticmethod
+    def views(blocks):
+        return (
+            blocks["actions"].buf.cast("B"),
+            blocks["obs"].buf.cast("d"),
+            blocks["rewards"].buf.cast("d"),
+            blocks["dones"].buf.cast("B"),
+        )
+
+    def arrays(self):
+        # numpy views over the shared buffers, no copies
+        if numpy is None:
+            raise RuntimeError("numpy is not installed; use the obs/rewards/dones memoryviews")
+        n = self.n_envs
+        return (
+            numpy.ndarray((n,), numpy.uint8, self.blocks["actions"].buf),
+            numpy.ndarray((n, OBS_DIM), numpy.float64, self.blocks["obs"].buf),
+            numpy.ndarray((n,), numpy.float64, self.blocks["rewards"].buf),
+            numpy.ndarray((n,), numpy.uint8, self.blocks["dones"].buf),
+        )
+
+    def dispatch(self, command):
+        if self.local is not None:
+            run_slots(self.local, 0, command, self.actions, self.obs, self.rewards, self.dones)
+            return
+        for conn in self.conns:
+            conn.send(command)
+        for conn in self.conns:
+            conn.recv()
+
+    def reset(self):
+        self.dispatch("reset")
+        return self.obs
+
+    def step(self, actions=None):
+        # actions may be written into self.actions in place beforehand
+        if actions is not None:
+            for i, a in enumerate(actions):
+                self.actions[i] = int(a)
+        self.dispatch("step")
+        return self.obs, self.rewards, self.dones
+
+    def close(self):
+        for conn in self.conns:
+            conn.send("close")
+        for proc in self.procs:
+            proc.join()
+        for conn in self.conns:
+            conn.close()
+        self.conns = []
+        self.procs = []
+        for v in (self.actions, self.obs, self.rewards, self.dones):
+            v.release()
+        for block in self.blocks.values():
+            block.close()
+            block.unlink()
+        self.blocks = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Batched simulation throughput")
+    parser.add_argument("--envs", type=int, default=64)
+    parser.add_argument("--workers", type=int, nargs="*", default=[0, 1, 2, 4])
+    parser.add_argument("--steps", type=int, default=600)
+    parser.add_argument("--level", type=int, default=0)
+    args = parser.parse_args()
+
+    for workers in args.workers:
+        with BatchEnv(args.envs, workers=workers, level_idx=args.level) as env:
+            env.reset()
+            episodes = 0
+            t0 = time.perf_counter()
+            for t in range(args.steps):
+                # scripted sweep so every env does something different
+                for i in range(args.envs):
+                    phase = ((t + 13 * i) // 90) % 2
+                    env.actions[i] = (2 if phase == 0 else 1) | (12 if (t + i) % 30 == 0 else 0)
+                env.step()
+                episodes += sum(env.dones)
+            elapsed = time.perf_counter() - t0
+        rate = args.envs * args.steps / elapsed
+        print(f"workers {workers:>2}: {rate:10.0f} env steps/s  ({episodes} episodes finished)")
+
+if __name__ == "__main__":
+    main_cli()
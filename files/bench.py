@@ -0,0 +1,314 @@
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+import pygame
+
+import main
+
+# ---------------------------------------
+# Benchmarks
+# ---------------------------------------
+# Drives a scripted run headlessly on each level and on synthetic levels with
+# 10x and 100x the rows (and so the cannons, saws and platforms), timing each
+# subsystem on its own. Times are reported in microseconds.
+#
+# --stress instead builds level 3 at very large row counts (100k+ entities)
+# and reports build time, traced memory per entity for the entities and for
+# their spatial grids, and per-tick cost at that size.
+#
+# --shots times the projectile pool alone (update plus the player's swept hit
+# test) with a fixed number of live shots, on the plain loops and on numpy.
+
+SUBSYSTEMS = ("build", "level_update", "collisions", "camera", "draw")
+PERCENTILES = (50, 95, 99)
+STRESS_ROWS = (6000, 30000, 60000)
+SHOT_COUNTS = (10, 50, 300)
+
+def scenarios():
+    for idx in range(3):
+        yield f"level{idx + 1}", idx, None
+    base = 18 + 2 * 4
+    for scale in (10, 100):
+        yield f"level3_x{scale}", 2, base * scale
+
+def scripted_inputs(tick):
+    # sweep left and right across the screen, jumping twice a second
+    phase = (tick // 90) % 2
+    return main.Inputs(
+        left=phase == 1,
+        right=phase == 0,
+        jump_held=tick % 30 < 4,
+        jump_pressed=tick % 30 == 0,
+    )
+
+def percentile(sorted_samples, p):
+    # nearest-rank percentile
+    k = max(0, min(len(sorted_samples) - 1, int(round(p / 100.0 * len(sorted_samples))) - 1))
+    return sorted_samples[k]
+
+def summarize(samples_ns):
+    samples = sorted(s / 1000.0 for s in samples_ns)
+    stats = {
+        "n": len(samples),
+        "mean": sum(samples) / len(samples),
+        "min": samples[0],
+        "max": samples[-1],
+    }
+    for p in PERCENTILES:
+        stats[f"p{p}"] = percentile(samples, p)
+    return stats
+
+def bench_build(idx, rows, repeat):
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter_ns()
+        main.Level(idx, rows=rows)
+        samples.append(time.perf_counter_ns() - t0)
+    return samples
+
+def reset(sim, level):
+    level.static_layer.invalidate()
+    sim.level = level
+    sim.player = main.Player(*level.spawn)
+    sim.cam_y = sim.player.rect.y - main.HEIGHT * 0.6
+    sim.state = main.STATE_PLAY
+    # the bench is about frame cost, not survival
+    sim.lives = 1 << 30
+
+def bench_frames(idx, rows, warmup, ticks, surf):
+    level = main.Level(idx, rows=rows)
+    level.prepare_render()
+    sim = main.Simulation()
+    reset(sim, level)
+    dt = main.SIM_DT
+    times = {name: [] for name in SUBSYSTEMS[1:]}
+    clock = time.perf_counter_ns
+    for tick in range(warmup + ticks):
+        if sim.level is not level or sim.state != main.STATE_PLAY:
+            reset(sim, level)
+        inputs = scripted_inputs(tick)
+        if inputs.jump_pressed:
+            sim.player.try_jump()
+        sim.player.update(dt, inputs)
+        t0 = clock()
+        level.update(dt, sim.player.rect.centery)
+        t1 = clock()
+        sim.handle_collisions(dt)
+        t2 = clock()
+        sim.update_camera(dt)
+        t3 = clock()
+        if sim.level is level:
+            level.draw(surf, sim.cam_y)
+        t4 = clock()
+        if tick >= warmup:
+            times["level_update"].append(t1 - t0)
+            times["collisions"].append(t2 - t1)
+            times["camera"].append(t3 - t2)
+            times["draw"].append(t4 - t3)
+    return level, times
+
+def entity_count(level):
+    return {
+        "platforms": len(level.platforms),
+        "saws": len(level.saws),
+        "moving_saws": len(level.moving_saws),
+        "cannons": len(level.cannons),
+    }
+
+def bench_stress(idx, rows, ticks, surf):
+    t0 = time.perf_counter()
+    level = main.Level(idx, rows=rows)
+    build_s = time.perf_counter() - t0
+    entities = entity_count(level)
+    n = sum(entities.values())
+    del level
+
+    # the same build again under tracemalloc, entities and grids measured apart
+    tracemalloc.start()
+    level = main.Level(idx, rows=rows, build=False)
+    base = tracemalloc.get_traced_memory()[0]
+    level.build()
+    level.platform_grid = level.saw_grid = level.moving_saw_grid = level.cannon_grid = None
+    entity_bytes = tracemalloc.get_traced_memory()[0] - base
+    level.build_index()
+    index_bytes = tracemalloc.get_traced_memory()[0] - base - entity_bytes
+    tracemalloc.stop()
+    del level
+
+    _, times = bench_frames(idx, rows, 10, ticks, surf)
+    parts = zip(times["level_update"], times["collisions"], times["camera"])
+    tick = [a + b + c for a, b, c in parts]
+    return {
+        "scenario": f"stress_{rows}",
+        "level": idx,
+        "rows": rows,
+        "entities": entities,
+        "total_entities": n,
+        "build_s": build_s,
+        "bytes_per_entity": entity_bytes / n,
+        "index_bytes_per_entity": index_bytes / n,
+        "tick": summarize(tick),
+        "draw": summarize(times["draw"]),
+    }
+
+def run_stress(args, surf):
+    results = []
+    for rows in args.stress_rows:
+        r = bench_stress(2, rows, args.stress_ticks, surf)
+        results.append(r)
+        print(
+            f"{r['scenario']}: {r['total_entities']} entities, build {r['build_s']:.2f} s, "
+            f"{r['bytes_per_entity']:.0f} + {r['index_bytes_per_entity']:.0f} B/entity, "
+            f"tick p50 {r['tick']['p50']:.0f} us",
+            file=sys.stderr,
+        )
+    return results
+
+def bench_shots(n, ticks, vectorize):
+    # cannon-like shots crossing the screen at every height, topped back up
+    # to n as they leave, against a player moving diagonally mid-screen
+    rng = random.Random(n)
+
+    def fire(x=None):
+        d = rng.choice((-1, 1))
+        if x is None:
+            x = 20 if d > 0 else main.WIDTH - 20
+        pool.spawn(x, rng.uniform(-2000, 2000), 260 * d, 0, 10)
+
+    pool = main.ProjectilePool()
+    for _ in range(n):
+        fire(rng.uniform(0, main.WIDTH))
+    rect = pygame.Rect(main.WIDTH // 2, 0, main.PLAYER_W, main.PLAYER_H)
+    saved = main.VECTOR_MIN_SHOTS
+    main.VECTOR_MIN_SHOTS = saved if vectorize else 1 << 30
+    samples = []
+    try:
+        for tick in range(ticks):
+            t0 = time.perf_counter_ns()
+            pool.update(main.SIM_DT)
+            pool.collides_swept(rect, 5, 3)
+            samples.append(time.perf_counter_ns() - t0)
+            while pool.n < n:
+                fire()
+    finally:
+        main.VECTOR_MIN_SHOTS = saved
+    return samples
+
+def run_shots(args):
+    backends = [("loops", False)]
+    if main.load_numpy() is not None:
+        backends.append(("numpy", True))
+    results = []
+    for n in args.shot_counts:
+        for name, vectorize in backends:
+            tick = summarize(bench_shots(n, args.ticks, vectorize))
+            results.append({"scenario": f"shots_{n}_{name}", "shots": n, "tick": tick})
+            print(f"shots {n:>4} {name:<6}p50 {tick['p50']:8.1f} us", file=sys.stderr)
+    return results
+
+def run(args):
+    pygame.font.init()
+    surf = pygame.Surface((main.WIDTH, main.HEIGHT))
+    if args.stress or args.shots:
+        results = run_stress(args, surf) if args.stress else run_shots(args)
+        scenario_list = ()
+    else:
+        results = []
+        scenario_list = scenarios()
+    for name, idx, rows in scenario_list:
+        if args.only and name not in args.only:
+            continue
+        build = bench_build(idx, rows, args.build_repeat)
+        level, times = bench_frames(idx, rows, args.warmup, args.ticks, surf)
+        subsystems = {"build": summarize(build)}
+        for key, samples in times.items():
+            subsystems[key] = summarize(samples)
+        results.append(
+            {
+                "scenario": name,
+                "level": idx,
+                "rows": level.rows,
+                "entities": entity_count(level),
+                "subsystems": subsystems,
+            }
+        )
+        print_row(results[-1])
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "pygame": pygame.version.ver,
+            "machine": platform.platform(),
+            "warmup": args.warmup,
+            "ticks": args.ticks,
+            "build_repeat": args.build_repeat,
+            "unit": "us",
+        },
+        "results": results,
+    }
+
+def print_row(result):
+    print(f"{result['scenario']} ({result['entities']})", file=sys.stderr)
+    for key, stats in result["subsystems"].items():
+        print(
+            f"  {key:<13}p50 {stats['p50']:9.1f}  p95 {stats['p95']:9.1f}"
+            f"  p99 {stats['p99']:9.1f}",
+            file=sys.stderr,
+        )
+
+def compare(current, baseline, tolerance):
+    # p95 regressions beyond tolerance against a previous JSON run
+    old = {r["scenario"]: r["subsystems"] for r in baseline["results"] if "subsystems" in r}
+    regressions = []
+    for result in current["results"]:
+        before = old.get(result["scenario"])
+        if before is None or "subsystems" not in result:
+            continue
+        for key, stats in result["subsystems"].items():
+            if key in before and stats["p95"] > before[key]["p95"] * (1.0 + tolerance):
+                regressions.append((result["scenario"], key, before[key]["p95"], stats["p95"]))
+    return regressions
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Headless per-subsystem benchmarks")
+    parser.add_argument("--ticks", type=int, default=1200)
+    parser.add_argument("--warmup", type=int, default=120)
+    parser.add_argument("--build-repeat", type=int, default=20)
+    parser.add_argument("--only", nargs="*", help="scenario names to run")
+    parser.add_argument("--out", help="write JSON results here instead of stdout")
+    parser.add_argument("--baseline", help="previous JSON results to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    parser.add_argument("--stress", action="store_true", help="large-level scaling mode")
+    parser.add_argument("--stress-rows", type=int, nargs="*", default=list(STRESS_ROWS))
+    parser.add_argument("--stress-ticks", type=int, default=120)
+    parser.add_argument("--shots", action="store_true", help="projectile pool mode")
+    parser.add_argument("--shot-counts", type=int, nargs="*", default=list(SHOT_COUNTS))
+    args = parser.parse_args()
+
+    report = run(args)
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        for scenario, key, before, after in regressions:
+            print(
+                f"REGRESSION {scenario} {key}: p95 {before:.1f} -> {after:.1f} us",
+                file=sys.stderr,
+            )
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main_cli()
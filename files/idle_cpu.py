@@ -0,0 +1,40 @@
+import argparse
+import time
+
+import main
+
+# ---------------------------------------
+# Idle CPU comparison
+# ---------------------------------------
+# Sits on each static screen for a few seconds, once redrawing at FPS like
+# the old loop and once with the event-driven idle loop, and reports how
+# much CPU the process burned per wall-clock second.
+
+def measure(game, state, idle_wait, seconds):
+    game.idle_wait = idle_wait
+    game.presented_state = None
+    game.sim.state = state
+    loops = 0
+    wall0 = time.perf_counter()
+    cpu0 = time.process_time()
+    while time.perf_counter() - wall0 < seconds:
+        game.frame()
+        loops += 1
+    wall = time.perf_counter() - wall0
+    cpu = time.process_time() - cpu0
+    return cpu / wall * 100.0, loops / wall
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Compare CPU use of the polling and idle loops")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    game = main.Game()
+    print(f"{'screen':<8}{'mode':<8}{'cpu %':>8}{'loops/s':>10}")
+    for state in (main.STATE_MENU, main.STATE_DEAD, main.STATE_WIN):
+        for label, idle_wait in (("poll", False), ("idle", True)):
+            cpu, rate = measure(game, state, idle_wait, args.seconds)
+            print(f"{state:<8}{label:<8}{cpu:>8.1f}{rate:>10.1f}")
+
+if __name__ == "__main__":
+    main_cli()
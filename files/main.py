@@ -1,6 +1,20 @@
+import argparse
+import heapq
 import math
+import mmap
+import os
 import random
+import struct
 import sys
+import threading
+import time
+import zlib
+from array import array
+from collections import OrderedDict
+
+# startup is timed from here, before pygame itself is imported
+START_TIME = time.perf_counter()
+
 import pygame
 
 # ---------------------------------------
@@ -8,6 +22,12 @@ import pygame
 # ---------------------------------------
 WIDTH, HEIGHT = 800, 900
 FPS = 60
+IDLE_WAIT_MS = 250
+# the simulation always advances in fixed ticks, whatever the render rate
+SIM_HZ = 60
+SIM_DT = 1.0 / SIM_HZ
+# most ticks run per rendered frame; a longer stall is dropped, not caught up
+SIM_MAX_STEPS = 8
 
 PLAYER_W, PLAYER_H = 38, 50
 PLAYER_SPEED = 5
@@ -17,9 +37,60 @@ COYOTE_TIME = 0.12
 JUMP_BUFFER = 0.12
 
 PLATFORM_H = 20
+GRID_CELL = 256
 LAVA_COLOR = (240, 80, 50)
 
 FONT_NAME = "arial"
+FONT_BIG = 64
+FONT_MED = 28
+FONT_SMALL = 22
+TEXT_CACHE_SIZE = 64
+# posted by the warm-up thread once the real fonts are loaded
+FONTS_READY = pygame.USEREVENT
+SAW_FRAMES = 24
+SAW_SPIN = 6.0
+PROJECTILE_POOL = 64
+# pools with this many live shots switch to numpy, if it's installed
+VECTOR_MIN_SHOTS = 48
+# cannons further than this from the player (vertically) hold fire
+CANNON_RANGE = HEIGHT
+
+PROFILE_FRAMES = 600
+PROFILE_FONT = "consolas,menlo,couriernew,monospace"
+PROFILE_STAGES = (
+    "input",
+    "player",
+    "level",
+    "collisions",
+    "camera",
+    "draw",
+    "hud",
+    "overlay",
+    "flip",
+)
+
+# each quality tier sheds this cosmetic work on top of the tiers before it
+QUALITY_TIERS = (
+    (),
+    ("bubbles",),
+    ("bubbles", "tip"),
+    ("bubbles", "tip", "labels"),
+)
+QUALITY_SMOOTHING = 0.05
+# drop a tier once frames average this far over budget, earn it back once
+# the work (not counting the tick's sleep) fits well inside it
+QUALITY_SLOW = 1.15
+QUALITY_FAST = 0.6
+# frames to wait after a change before judging the average again
+QUALITY_HOLD = 90
+
+LEVEL_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "level_cache")
+# bump whenever Level.build changes so stale cache files are rebuilt
+LEVEL_FORMAT_VERSION = 1
+
+BG_COLOR = (22, 26, 40)
+STATIC_CHUNK_H = HEIGHT
+STATIC_CHUNK_CACHE = 4
 
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
@@ -35,12 +106,42 @@ STATE_PLAY = "play"
 STATE_DEAD = "dead"
 STATE_WIN = "win"
 
+# fixed levels are 0 .. LEVEL_COUNT - 1 and level_idx never leaves that range
+# for them, a win keeps the last one. endless mode is its own id, which also
+# sets its difficulty one step past the last fixed level
+LEVEL_COUNT = 3
+ENDLESS_LEVEL = LEVEL_COUNT
+ENDLESS_CHUNK_ROWS = 8
+ENDLESS_AHEAD = 2 * HEIGHT
+ENDLESS_EVICT_BELOW = HEIGHT
+
 # ---------------------------------------
 # Helper
 # ---------------------------------------
+# numpy is optional and takes longer to import than the game takes to show its
+# first frame, so it is only loaded once something is big enough to need it
+numpy = None
+numpy_checked = False
+
+def load_numpy():
+    # the numpy module, or None if it isn't installed
+    global numpy, numpy_checked
+    if not numpy_checked:
+        numpy_checked = True
+        try:
+            import numpy as module
+        except ImportError:
+            module = None
+        numpy = module
+    return numpy
+
 def clamp(v, lo, hi):
     return max(lo, min(hi, v))
 
+def lerp(a, b, t):
+    # exact at both ends, so alpha 1.0 draws the current state unchanged
+    return a * (1.0 - t) + b * t
+
 def circle_rect_collision(cx, cy, r, rect):
     nx = clamp(cx, rect.left, rect.right)
     ny = clamp(cy, rect.top, rect.bottom)
@@ -48,6 +149,155 @@ def circle_rect_collision(cx, cy, r, rect):
     dy = cy - ny
     return (dx * dx + dy * dy) <= r * r
 
+def segment_hits_rect(x0, y0, x1, y1, rect):
+    # Liang-Barsky clip of the segment against the rect
+    vx = x1 - x0
+    vy = y1 - y0
+    t0, t1 = 0.0, 1.0
+    for p, q in (
+        (-vx, x0 - rect.left),
+        (vx, rect.right - x0),
+        (-vy, y0 - rect.top),
+        (vy, rect.bottom - y0),
+    ):
+        if p == 0:
+            if q < 0:
+                return False
+        else:
+            t = q / p
+            if p < 0:
+                t0 = max(t0, t)
+            else:
+                t1 = min(t1, t)
+            if t0 > t1:
+                return False
+    return True
+
+def swept_circle_rect_collision(x0, y0, x1, y1, r, rect):
+    # a circle moving from (x0, y0) to (x1, y1) touches the rect if the
+    # segment comes within r of it; the closest approach is either a crossing,
+    # a segment endpoint or a rect corner. contact already there at the start
+    # was judged on the previous step, so then only the end position counts
+    if x0 == x1 and y0 == y1 or circle_rect_collision(x0, y0, r, rect):
+        return circle_rect_collision(x1, y1, r, rect)
+    if segment_hits_rect(x0, y0, x1, y1, rect):
+        return True
+    rr = r * r
+    dx = x1 - clamp(x1, rect.left, rect.right)
+    dy = y1 - clamp(y1, rect.top, rect.bottom)
+    if dx * dx + dy * dy <= rr:
+        return True
+    vx = x1 - x0
+    vy = y1 - y0
+    ll = vx * vx + vy * vy
+    for cx, cy in (
+        (rect.left, rect.top),
+        (rect.right, rect.top),
+        (rect.left, rect.bottom),
+        (rect.right, rect.bottom),
+    ):
+        t = clamp(((cx - x0) * vx + (cy - y0) * vy) / ll, 0.0, 1.0)
+        dx = x0 + t * vx - cx
+        dy = y0 + t * vy - cy
+        if dx * dx + dy * dy <= rr:
+            return True
+    return False
+
+class SpatialGrid:
+    # vertical bucket grid, entities are filed under every row their y extent
+    # covers. items are kept once in insertion order and a bucket is a typed
+    # array of their indexes, so filing an entity costs 4 bytes per row.
+    # extents must not change while an item is filed
+    def __init__(self, items=(), cell=GRID_CELL):
+        self.cell = cell
+        self.buckets = {}
+        self.items = []
+        # id(item) -> index, only built once something is removed
+        self.slots = None
+        self.dead = 0
+        for item in items:
+            self.insert(item)
+
+    def rows(self, item):
+        top, bottom = item.extent()
+        return range(int(top // self.cell), int(bottom // self.cell) + 1)
+
+    def insert(self, item):
+        i = len(self.items)
+        self.items.append(item)
+        if self.slots is not None:
+            self.slots[id(item)] = i
+        buckets = self.buckets
+        for r in self.rows(item):
+            bucket = buckets.get(r)
+            if bucket is None:
+                bucket = buckets[r] = array("i")
+            bucket.append(i)
+
+    def remove(self, item):
+        if self.slots is None:
+            self.slots = {id(it): i for i, it in enumerate(self.items) if it is not None}
+        i = self.slots.pop(id(item))
+        self.items[i] = None
+        for r in self.rows(item):
+            bucket = self.buckets[r]
+            bucket.remove(i)
+            if not bucket:
+                del self.buckets[r]
+        self.dead += 1
+        if self.dead > 64 and self.dead * 2 > len(self.items):
+            self.compact()
+
+    def compact(self):
+        # renumber the survivors so removed slots don't pile up
+        live = [it for it in self.items if it is not None]
+        self.buckets = {}
+        self.items = []
+        self.slots = {}
+        self.dead = 0
+        for item in live:
+            self.insert(item)
+
+    def query(self, top, bottom):
+        # items whose extent may overlap [top, bottom], in insertion order
+        r0, r1 = int(top // self.cell), int(bottom // self.cell)
+        items = self.items
+        if r0 == r1:
+            return [items[i] for i in self.buckets.get(r0, ())]
+        found = set()
+        for r in range(r0, r1 + 1):
+            bucket = self.buckets.get(r)
+            if bucket is not None:
+                found.update(bucket)
+        return [items[i] for i in sorted(found)]
+
+# ---------------------------------------
+# Input
+# ---------------------------------------
+class Inputs:
+    # one tick of player intent, independent of pygame's key state
+    def __init__(self, left=False, right=False, jump_held=False, jump_pressed=False):
+        self.left = left
+        self.right = right
+        self.jump_held = jump_held
+        self.jump_pressed = jump_pressed
+
+    @classmethod
+    def from_keys(cls, keys, jump_pressed=False):
+        return cls(
+            left=bool(keys[pygame.K_a] or keys[pygame.K_LEFT]),
+            right=bool(keys[pygame.K_d] or keys[pygame.K_RIGHT]),
+            jump_held=bool(keys[pygame.K_SPACE] or keys[pygame.K_w] or keys[pygame.K_UP]),
+            jump_pressed=jump_pressed,
+        )
+
+    def flags(self):
+        return self.left | self.right << 1 | self.jump_held << 2 | self.jump_pressed << 3
+
+    @classmethod
+    def from_flags(cls, flags):
+        return cls(bool(flags & 1), bool(flags & 2), bool(flags & 4), bool(flags & 8))
+
 # ---------------------------------------
 # Entities
 # ---------------------------------------
@@ -61,14 +311,22 @@ class Player:
         self.jump_buffer_timer = 0.0
         self.facing = 1
         self.invuln_timer = 0.0
+        # vely before the last gravity update, only read within the same step
+        self.start_vely = 0
+        # position before the last tick, for interpolated drawing
+        self.prev_x = x
+        self.prev_y = y
+
+    def update(self, dt, inputs):
+        self.prev_x = self.rect.x
+        self.prev_y = self.rect.y
 
-    def update(self, dt, keys):
         # horizontal move
         self.velx = 0
-        if keys[pygame.K_a] or keys[pygame.K_LEFT]:
+        if inputs.left:
             self.velx = -PLAYER_SPEED
             self.facing = -1
-        if keys[pygame.K_d] or keys[pygame.K_RIGHT]:
+        if inputs.right:
             self.velx = PLAYER_SPEED
             self.facing = 1
 
@@ -78,11 +336,13 @@ class Player:
         self.invuln_timer = max(0.0, self.invuln_timer - dt)
 
         # jump buffer input
-        if keys[pygame.K_SPACE] or keys[pygame.K_w] or keys[pygame.K_UP]:
+        if inputs.jump_held:
             self.jump_buffer_timer = JUMP_BUFFER
 
-        # gravity
-        self.vely += GRAVITY
+        # gravity; velocities are px per SIM_DT tick and a step of dt covers
+        # dt / SIM_DT ticks, exactly 1.0 at the fixed rate
+        self.start_vely = self.vely
+        self.vely += GRAVITY * (dt / SIM_DT)
         self.vely = clamp(self.vely, -50, 30)
 
     def try_jump(self):
@@ -92,22 +352,29 @@ class Player:
             self.coyote_timer = 0.0
             self.jump_buffer_timer = 0.0
 
-    def draw(self, surf, cam_y):
+    def draw(self, surf, cam_y, alpha=1.0):
         color = YELLOW if self.invuln_timer > 0 else BLUE
+        x = round(lerp(self.prev_x, self.rect.x, alpha))
+        y = round(lerp(self.prev_y, self.rect.y, alpha))
         pygame.draw.rect(
             surf,
             color,
-            pygame.Rect(self.rect.x, self.rect.y - cam_y, self.rect.w, self.rect.h),
+            pygame.Rect(x, y - cam_y, self.rect.w, self.rect.h),
         )
         # simple face
-        eye_y = self.rect.y - cam_y + 15
-        ex = self.rect.centerx + (10 * self.facing)
+        eye_y = y - cam_y + 15
+        ex = x + self.rect.w // 2 + (10 * self.facing)
         pygame.draw.circle(surf, BLACK, (ex, eye_y), 4)
 
 class Platform:
+    __slots__ = ("rect",)
+
     def __init__(self, x, y, w):
         self.rect = pygame.Rect(x, y, w, PLATFORM_H)
 
+    def extent(self):
+        return self.rect.top, self.rect.bottom
+
     def draw(self, surf, cam_y):
         pygame.draw.rect(
             surf,
@@ -116,71 +383,90 @@ class Platform:
         )
 
 class Saw:
-    # stationary spinning saw
+    # stationary spinning saw, its angle is SAW_SPIN times the level clock
+    __slots__ = ("x", "y", "r", "px", "py")
+
     def __init__(self, x, y, r=20):
         self.x = x
         self.y = y
         self.r = r
-        self.angle = 0.0
+        # centre at the previous tick, for swept tests
+        self.px = x
+        self.py = y
 
-    def update(self, dt):
-        self.angle += 6.0 * dt
+    def extent(self):
+        return self.y - self.r, self.y + self.r
 
     def collides(self, rect):
         return circle_rect_collision(self.x, self.y, self.r - 2, rect)
 
-    def draw(self, surf, cam_y):
-        cy = self.y - cam_y
-        pygame.draw.circle(surf, WHITE, (int(self.x), int(cy)), self.r)
-        spoke_len = self.r
-        for k in range(4):
-            a = self.angle + k * math.pi / 2
-            x2 = self.x + math.cos(a) * spoke_len
-            y2 = cy + math.sin(a) * spoke_len
-            pygame.draw.line(surf, BLACK, (self.x, cy), (x2, y2), 3)
-        pygame.draw.circle(surf, BLACK, (int(self.x), int(cy)), 4)
+    def collides_swept(self, rect, dx=0, dy=0):
+        # rect is where the player ended up after moving (dx, dy) this step;
+        # the saw's motion is taken relative to the player's
+        return swept_circle_rect_collision(
+            self.px + dx, self.py + dy, self.x, self.y, self.r - 2, rect
+        )
+
+    def draw(self, surf, cam_y, angle, alpha=1.0):
+        sprite = saw_atlas.frame(self.r, angle)
+        half = sprite.get_width() // 2
+        x = lerp(self.px, self.x, alpha)
+        y = lerp(self.py, self.y, alpha)
+        surf.blit(sprite, (int(x) - half, int(y - cam_y) - half))
 
 class MovingSaw(Saw):
+    # ping-pongs between a and b; the position is a triangle wave of the level
+    # clock, so it is only worked out when something looks at the saw
+    __slots__ = ("ax", "ay", "bx", "by", "speed", "dist", "duration")
+
     def __init__(self, x1, y1, x2, y2, r=22, speed=120.0):
         super().__init__(x1, y1, r)
         self.ax, self.ay = x1, y1
         self.bx, self.by = x2, y2
-        self.t = 0.0
-        self.dir = 1
         self.speed = speed
         self.dist = math.hypot(self.bx - self.ax, self.by - self.ay)
         self.duration = max(0.1, self.dist / self.speed)
 
-    def update(self, dt):
-        super().update(dt)
-        self.t += self.dir * dt
-        if self.t > self.duration:
-            self.t = self.duration
-            self.dir = -1
-        if self.t < 0.0:
-            self.t = 0.0
-            self.dir = 1
-        u = 0 if self.duration == 0 else self.t / self.duration
-        self.x = self.ax + (self.bx - self.ax) * u
-        self.y = self.ay + (self.by - self.ay) * u
+    def extent(self):
+        # the whole path, so the grid entry never goes stale
+        return min(self.ay, self.by) - self.r, max(self.ay, self.by) + self.r
+
+    def position(self, t):
+        u = (t % (2.0 * self.duration)) / self.duration
+        if u > 1.0:
+            u = 2.0 - u
+        return self.ax + (self.bx - self.ax) * u, self.ay + (self.by - self.ay) * u
+
+    def place(self, t, prev_t):
+        # positions at this tick and the previous one, for drawing and swept tests
+        self.px, self.py = self.position(prev_t)
+        self.x, self.y = self.position(t)
 
 class Cannon:
-    # fires projectiles horizontally inward
-    def __init__(self, x, y, direction=1, cooldown=1.4, speed=260, radius=10):
+    # fires projectiles horizontally inward at timer + k * cooldown on the
+    # level clock
+    __slots__ = ("x", "y", "dir", "cooldown", "timer", "speed", "radius")
+
+    def __init__(self, x, y, direction=1, cooldown=1.4, speed=260, radius=10, rng=random):
         self.x = x
         self.y = y
         self.dir = 1 if direction >= 0 else -1
         self.cooldown = cooldown
-        self.timer = random.uniform(0, cooldown)
+        self.timer = rng.uniform(0, cooldown)
         self.speed = speed
         self.radius = radius
 
-    def update(self, dt, projectiles):
-        self.timer -= dt
-        if self.timer <= 0:
-            self.timer = self.cooldown
-            vx = self.speed * self.dir
-            projectiles.append(Projectile(self.x, self.y, vx, 0, self.radius))
+    def extent(self):
+        return self.y - 12, self.y + 12
+
+    def next_fire(self, after):
+        # the first firing strictly later than `after`
+        if after < self.timer:
+            return self.timer
+        return self.timer + (math.floor((after - self.timer) / self.cooldown) + 1) * self.cooldown
+
+    def fire(self, projectiles):
+        projectiles.spawn(self.x, self.y, self.speed * self.dir, 0, self.radius)
 
     def draw(self, surf, cam_y):
         cy = self.y - cam_y
@@ -189,28 +475,158 @@ class Cannon:
         barrel = pygame.Rect(self.x + (14 * self.dir), cy - 6, 18 * self.dir, 12)
         pygame.draw.rect(surf, BLACK, barrel)
 
-class Projectile:
-    def __init__(self, x, y, vx, vy, r=10):
-        self.x = x
-        self.y = y
-        self.vx = vx
-        self.vy = vy
-        self.r = r
-        self.alive = True
+class ProjectilePool:
+    # struct of arrays, live shots are packed into slots [0, n) in firing
+    # order and slots are reused, so nothing is allocated per shot. once a pool
+    # holds VECTOR_MIN_SHOTS it is updated and broad-phased through numpy views
+    # of the same arrays, when numpy is installed
+    def __init__(self, capacity=PROJECTILE_POOL):
+        self.n = 0
+        self.capacity = capacity
+        self.x = array("d", bytes(8 * capacity))
+        self.y = array("d", bytes(8 * capacity))
+        self.vx = array("d", bytes(8 * capacity))
+        self.vy = array("d", bytes(8 * capacity))
+        self.r = array("i", bytes(4 * capacity))
+        # positions before the last update, for swept tests
+        self.px = array("d", bytes(8 * capacity))
+        self.py = array("d", bytes(8 * capacity))
+        self.y_min = -20000
+        self.y_max = 20000
+
+    def __len__(self):
+        return self.n
+
+    def columns(self):
+        return (self.x, self.y, self.vx, self.vy, self.r, self.px, self.py)
+
+    def vectorized(self):
+        # numpy views of the live slots, or None to use the plain loops. the
+        # views must be dropped before the pool grows
+        if self.n < VECTOR_MIN_SHOTS:
+            return None
+        np = load_numpy()
+        if np is None:
+            return None
+        return [np.frombuffer(col, col.typecode, self.n) for col in self.columns()]
+
+    def grow(self):
+        extra = self.capacity
+        self.capacity += extra
+        for col in self.columns():
+            col.frombytes(bytes(col.itemsize * extra))
+
+    def spawn(self, x, y, vx, vy, r=10):
+        if self.n == self.capacity:
+            self.grow()
+        i = self.n
+        self.x[i] = x
+        self.y[i] = y
+        self.vx[i] = vx
+        self.vy[i] = vy
+        self.r[i] = r
+        self.px[i] = x
+        self.py[i] = y
+        self.n += 1
+
+    def in_bounds(self, x, y):
+        return -100 <= x <= WIDTH + 100 and self.y_min <= y <= self.y_max
 
     def update(self, dt):
-        self.x += self.vx * dt
-        self.y += self.vy * dt
-        if self.x < -100 or self.x > WIDTH + 100 or self.y < -20000 or self.y > 20000:
-            self.alive = False
-
-    def collides(self, rect):
-        return circle_rect_collision(self.x, self.y, self.r - 1, rect)
+        n = self.n
+        if n == 0:
+            return
+        views = self.vectorized()
+        if views is not None:
+            x, y, vx, vy, _, px, py = views
+            px[:] = x
+            py[:] = y
+            x += vx * dt
+            y += vy * dt
+            keep = (x >= -100) & (x <= WIDTH + 100) & (y >= self.y_min) & (y <= self.y_max)
+            if not keep.all():
+                live = keep.nonzero()[0]
+                for col in views:
+                    col[: len(live)] = col[live]
+                self.n = len(live)
+            return
 
-    def draw(self, surf, cam_y):
-        pygame.draw.circle(surf, RED, (int(self.x), int(self.y - cam_y)), self.r)
+        # whole-column passes; the per-shot loop only runs when a shot leaves
+        xs, ys, pxs, pys = self.x, self.y, self.px, self.py
+        new_x = [x + vx * dt for x, vx in zip(xs[:n], self.vx[:n])]
+        new_y = [y + vy * dt for y, vy in zip(ys[:n], self.vy[:n])]
+        pxs[:n] = xs[:n]
+        pys[:n] = ys[:n]
+        xs[:n] = array("d", new_x)
+        ys[:n] = array("d", new_y)
+        if (
+            min(new_x) < -100
+            or max(new_x) > WIDTH + 100
+            or min(new_y) < self.y_min
+            or max(new_y) > self.y_max
+        ):
+            self.compact()
+
+    def compact(self):
+        # drop shots that left the world, keeping the rest in firing order
+        columns = self.columns()
+        xs, ys = self.x, self.y
+        j = 0
+        for i in range(self.n):
+            if self.in_bounds(xs[i], ys[i]):
+                if i != j:
+                    for col in columns:
+                        col[j] = col[i]
+                j += 1
+        self.n = j
+
+    def collides_swept(self, rect, dx=0, dy=0):
+        # same relative sweep as Saw.collides_swept
+        xs, ys, pxs, pys, rs = self.x, self.y, self.px, self.py, self.r
+        views = self.vectorized()
+        if views is None:
+            candidates = range(self.n)
+        else:
+            # broad phase: shots whose swept box reaches the rect
+            x, y, _, _, r, px, py = views
+            x0 = px + dx
+            y0 = py + dy
+            reach = r - 1
+            near = (
+                (numpy.minimum(x0, x) - reach <= rect.right)
+                & (numpy.maximum(x0, x) + reach >= rect.left)
+                & (numpy.minimum(y0, y) - reach <= rect.bottom)
+                & (numpy.maximum(y0, y) + reach >= rect.top)
+            )
+            candidates = near.nonzero()[0].tolist()
+            del views, x, y, r, px, py
+        top, bottom = rect.top, rect.bottom
+        for i in candidates:
+            # cheap reject first: the shot's vertical band, relative to the
+            # player, has to reach the rect before the exact sweep is worth it
+            y0 = pys[i] + dy
+            y1 = ys[i]
+            reach = rs[i] - 1
+            if y0 < y1:
+                if y1 + reach < top or y0 - reach > bottom:
+                    continue
+            elif y0 + reach < top or y1 - reach > bottom:
+                continue
+            if swept_circle_rect_collision(pxs[i] + dx, y0, xs[i], y1, reach, rect):
+                return True
+        return False
+
+    def draw(self, surf, cam_y, view_top, view_bottom, alpha=1.0):
+        xs, ys, pxs, pys, rs = self.x, self.y, self.px, self.py, self.r
+        for i in range(self.n):
+            if view_top <= ys[i] <= view_bottom:
+                x = lerp(pxs[i], xs[i], alpha)
+                y = lerp(pys[i], ys[i], alpha)
+                pygame.draw.circle(surf, RED, (int(x), int(y - cam_y)), rs[i])
 
 class Door:
+    __slots__ = ("rect",)
+
     def __init__(self, x, y, w=50, h=80):
         # y is door floor line
         self.rect = pygame.Rect(x, y - h, w, h)
@@ -222,89 +638,300 @@ class Door:
         knob = (r.right - 12, r.centery)
         pygame.draw.circle(surf, BLACK, knob, 5)
 
+# ---------------------------------------
+# Render caches
+# ---------------------------------------
+class StaticLayer:
+    # platforms and the door never move, so they are drawn once per chunk of
+    # world height and the chunks near the camera are kept in a small LRU
+    def __init__(self, level, chunk_h=STATIC_CHUNK_H, capacity=STATIC_CHUNK_CACHE):
+        self.level = level
+        self.chunk_h = chunk_h
+        self.capacity = capacity
+        self.chunks = OrderedDict()
+
+    def invalidate(self):
+        self.chunks.clear()
+
+    def invalidate_range(self, top, bottom):
+        for k in range(int(top // self.chunk_h), int(bottom // self.chunk_h) + 1):
+            self.chunks.pop(k, None)
+
+    def chunk(self, k, target):
+        surf = self.chunks.get(k)
+        if surf is not None:
+            self.chunks.move_to_end(k)
+            return surf
+        surf = pygame.Surface((WIDTH, self.chunk_h), 0, target)
+        surf.fill(BG_COLOR)
+        top = k * self.chunk_h
+        for p in self.level.platform_grid.query(top, top + self.chunk_h):
+            p.draw(surf, top)
+        door = self.level.door
+        if door is not None and door.rect.bottom >= top and door.rect.top < top + self.chunk_h:
+            door.draw(surf, top)
+        self.chunks[k] = surf
+        if len(self.chunks) > self.capacity:
+            self.chunks.popitem(last=False)
+        return surf
+
+    def visible(self, cam_y):
+        # entities truncate (y - cam_y) to screen pixels, which is y - ceil(cam_y)
+        cam = math.ceil(cam_y)
+        return cam, range(cam // self.chunk_h, (cam + HEIGHT - 1) // self.chunk_h + 1)
+
+    def prepare(self, cam_y, target):
+        # render the chunks a view at cam_y needs ahead of time
+        for k in self.visible(cam_y)[1]:
+            self.chunk(k, target)
+
+    def draw(self, surf, cam_y):
+        cam, ks = self.visible(cam_y)
+        for k in ks:
+            surf.blit(self.chunk(k, surf), (0, k * self.chunk_h - cam))
+
+class TextCache:
+    # fonts are loaded once, rendered strings are kept in a bounded LRU so
+    # unchanged labels are never re-rendered
+    def __init__(self, capacity=TEXT_CACHE_SIZE):
+        self.capacity = capacity
+        self.fonts = {}
+        self.surfaces = OrderedDict()
+        # while set, fonts not loaded yet are stood in for by pygame's bundled
+        # font, which needs no system font lookup; those renders aren't cached
+        self.fallback = False
+        # FreeType can't open fonts on two threads at once, every font is
+        # created under this lock
+        self.lock = threading.Lock()
+
+    def font(self, size, bold=False, name=FONT_NAME):
+        key = (name, size, bold)
+        f = self.fonts.get(key)
+        if f is None:
+            if self.fallback:
+                return self.default_font(size, bold)
+            with self.lock:
+                f = self.fonts[key] = pygame.font.SysFont(name, size, bold=bold)
+        return f
+
+    def default_font(self, size, bold=False):
+        key = (None, size, bold)
+        f = self.fonts.get(key)
+        if f is None:
+            with self.lock:
+                f = pygame.font.Font(None, size)
+            f.bold = bold
+            self.fonts[key] = f
+        return f
+
+    def load_fallback(self, keys):
+        # stand-ins for (size, bold, name) fonts, made on the main thread before
+        # load runs on another so the main thread never opens a font meanwhile
+        for size, bold, _ in keys:
+            self.default_font(size, bold)
+        self.fallback = True
+
+    def load(self, keys):
+        # resolve (size, bold, name) fonts off the main thread and publish
+        # them together, the main thread only ever sees finished fonts
+        loaded = {}
+        for size, bold, name in keys:
+            if (name, size, bold) not in self.fonts:
+                with self.lock:
+                    loaded[name, size, bold] = pygame.font.SysFont(name, size, bold=bold)
+        self.fonts.update(loaded)
+        self.fallback = False
+
+    def render(self, text, size, color, bold=False, name=FONT_NAME):
+        key = (name, size, bold, text, color)
+        surf = self.surfaces.get(key)
+        if surf is not None:
+            self.surfaces.move_to_end(key)
+            return surf
+        if self.fallback and key[:3] not in self.fonts:
+            return self.default_font(size, bold).render(text, True, color)
+        surf = self.font(size, bold, name).render(text, True, color)
+        self.surfaces[key] = surf
+        if len(self.surfaces) > self.capacity:
+            self.surfaces.popitem(last=False)
+        return surf
+
+text_cache = TextCache()
+
+class SawAtlas:
+    # the four spokes repeat every quarter turn, so each radius is rendered
+    # once at SAW_FRAMES angles across [0, pi/2) and drawn with a single blit
+    def __init__(self, frames=SAW_FRAMES):
+        self.frames = frames
+        self.sprites = {}
+
+    def prepare(self, r):
+        sprites = self.sprites.get(r)
+        if sprites is not None:
+            return sprites
+        pad = 2
+        c = r + pad
+        sprites = []
+        for i in range(self.frames):
+            surf = pygame.Surface((2 * c + 1, 2 * c + 1), pygame.SRCALPHA)
+            pygame.draw.circle(surf, WHITE, (c, c), r)
+            for k in range(4):
+                a = (i / self.frames + k) * math.pi / 2
+                x2 = c + math.cos(a) * r
+                y2 = c + math.sin(a) * r
+                pygame.draw.line(surf, BLACK, (c, c), (x2, y2), 3)
+            pygame.draw.circle(surf, BLACK, (c, c), 4)
+            sprites.append(surf)
+        self.sprites[r] = sprites
+        return sprites
+
+    def frame(self, r, angle):
+        i = int(round(angle * 2 / math.pi * self.frames)) % self.frames
+        return self.prepare(r)[i]
+
+saw_atlas = SawAtlas()
+
+class QualityGovernor:
+    # picks a tier from moving averages of Clock.tick: sustained frames over
+    # budget shed a tier, frames with plenty of headroom earn it back. the gap
+    # between the two thresholds plus a hold after every change keeps it from
+    # flapping. a pinned tier (None for automatic) overrides the averages
+    def __init__(self, fps=FPS):
+        self.budget = 1000.0 / fps
+        self.avg_ms = self.budget
+        self.avg_work_ms = 0.0
+        self.pinned = None
+        self.set_tier(0)
+
+    def set_tier(self, tier):
+        self.tier = tier
+        self.shed = frozenset(QUALITY_TIERS[tier])
+        self.hold = QUALITY_HOLD
+
+    def pin(self, tier):
+        self.pinned = tier
+        if tier is not None:
+            self.set_tier(tier)
+
+    def enabled(self, feature):
+        return feature not in self.shed
+
+    def update(self, ms, work_ms):
+        # ms is what tick returned, work_ms the part of it spent outside the sleep
+        k = QUALITY_SMOOTHING
+        self.avg_ms += (ms - self.avg_ms) * k
+        self.avg_work_ms += (work_ms - self.avg_work_ms) * k
+        if self.pinned is not None:
+            return
+        if self.hold > 0:
+            self.hold -= 1
+        elif self.avg_ms > self.budget * QUALITY_SLOW and self.tier < len(QUALITY_TIERS) - 1:
+            self.set_tier(self.tier + 1)
+        elif self.avg_work_ms < self.budget * QUALITY_FAST and self.tier > 0:
+            self.set_tier(self.tier - 1)
+
+quality = QualityGovernor()
+
 # ---------------------------------------
 # Level
 # ---------------------------------------
 class Level:
-    def __init__(self, idx):
+    def __init__(self, idx, seed=None, build=True, rows=None):
         self.idx = idx
+        self.seed = 100 + idx * 7 if seed is None else seed
+        self.rows = 18 + idx * 4 if rows is None else rows
+        self.rng = random.Random(self.seed)
         self.platforms = []
         self.saws = []
         self.moving_saws = []
         self.cannons = []
-        self.projectiles = []
+        self.projectiles = ProjectilePool()
         self.door = None
         self.spawn = (WIDTH // 2, 0)
         self.height = 4000
         self.lava_y = 2000
         self.lava_speed = 35 + 10 * idx
         self.lava_accel = 1.001
-        self.build()
+        # lava height before the last update, None until the first one
+        self.prev_lava_y = None
+        # hazards are functions of this clock. fire_heap holds (time, seq,
+        # cannon) for the cannons near the player, the ones in `armed`
+        self.clock = 0.0
+        self.prev_clock = 0.0
+        self.fire_heap = []
+        self.armed = set()
+        self.fire_seq = 0
+        self.top_y = 0
+        self.static_layer = StaticLayer(self)
+        if build:
+            self.build()
+
+    def add_row(self, i, y):
+        rng = self.rng
+        count = 3 if i % 2 == 0 else 2
+        gap = 140 if self.idx == 0 else 120
+        jitter = 40 if self.idx >= 1 else 25
+        w = 200 if self.idx == 0 else 160
+        self.add_platform_row(y, count, gap, jitter, w)
+
+        # hazards
+        if i % 3 == 2:
+            for p in self.platforms[-count:]:
+                if rng.random() < 0.5:
+                    sx = p.rect.centerx
+                    sy = p.rect.y - 30
+                    self.saws.append(Saw(sx, sy, 20 + 2 * self.idx))
+        if i % 4 == 1:
+            row = self.platforms[-count:]
+            if len(row) >= 2:
+                a = row[0].rect
+                b = row[-1].rect
+                ymid = min(a.y, b.y) - 80
+                self.moving_saws.append(
+                    MovingSaw(
+                        a.centerx,
+                        ymid,
+                        b.centerx,
+                        ymid,
+                        r=22 + 2 * self.idx,
+                        speed=140 + 10 * self.idx,
+                    )
+                )
+        if i % 5 == 0 and i > 0:
+            # side cannons that fire inward
+            side = rng.choice(["left", "right"])
+            if side == "left":
+                cx, dir_in = 20, 1
+            else:
+                cx, dir_in = WIDTH - 20, -1
+            self.cannons.append(
+                Cannon(
+                    cx,
+                    y - 40,
+                    direction=dir_in,
+                    cooldown=1.6 - min(0.6, 0.1 * self.idx),
+                    speed=240 + 20 * self.idx,
+                    rng=rng,
+                )
+            )
 
     def add_platform_row(self, y, count, gap=120, jitter=30, w=180):
         margin = 60
         total_width = count * w + (count - 1) * gap
         start_x = (WIDTH - total_width) // 2
         for i in range(count):
-            xi = start_x + i * (w + gap) + random.randint(-jitter, jitter)
+            xi = start_x + i * (w + gap) + self.rng.randint(-jitter, jitter)
             self.platforms.append(Platform(xi, y, w))
 
     def build(self):
-        rng = random.Random(100 + self.idx * 7)
-
         # ground base
         self.platforms.append(Platform(0, 2000, WIDTH))
 
         # stacked rows
         y = 1800
-        rows = 18 + self.idx * 4
+        rows = self.rows
         for i in range(rows):
-            count = 3 if i % 2 == 0 else 2
-            gap = 140 if self.idx == 0 else 120
-            jitter = 40 if self.idx >= 1 else 25
-            w = 200 if self.idx == 0 else 160
-            self.add_platform_row(y, count, gap, jitter, w)
-
-            # hazards
-            if i % 3 == 2:
-                for p in self.platforms[-count:]:
-                    if rng.random() < 0.5:
-                        sx = p.rect.centerx
-                        sy = p.rect.y - 30
-                        self.saws.append(Saw(sx, sy, 20 + 2 * self.idx))
-            if i % 4 == 1:
-                row = self.platforms[-count:]
-                if len(row) >= 2:
-                    a = row[0].rect
-                    b = row[-1].rect
-                    ymid = min(a.y, b.y) - 80
-                    self.moving_saws.append(
-                        MovingSaw(
-                            a.centerx,
-                            ymid,
-                            b.centerx,
-                            ymid,
-                            r=22 + 2 * self.idx,
-                            speed=140 + 10 * self.idx,
-                        )
-                    )
-            if i % 5 == 0 and i > 0:
-                # side cannons that fire inward
-                side = rng.choice(["left", "right"])
-                if side == "left":
-                    cx, dir_in = 20, 1
-                else:
-                    cx, dir_in = WIDTH - 20, -1
-                self.cannons.append(
-                    Cannon(
-                        cx,
-                        y - 40,
-                        direction=dir_in,
-                        cooldown=1.6 - min(0.6, 0.1 * self.idx),
-                        speed=240 + 20 * self.idx,
-                    )
-                )
-
+            self.add_row(i, y)
             y -= 180 - 10 * self.idx
 
         # door just above the highest platform
@@ -318,81 +945,410 @@ class Level:
         self.spawn = (WIDTH // 2 - PLAYER_W // 2, 2000 - PLAYER_H - 2)
         self.lava_y = 2050
         self.lava_speed = 40 + 12 * self.idx
-
-    def update(self, dt):
+        self.build_index()
+
+    # compiled level file: header, world settings, four entity counts, then
+    # one fixed-size little-endian record per platform, saw, moving saw and cannon
+    HEADER = struct.Struct("<4sHHq")
+    WORLD = struct.Struct("<iiiddiiii")
+    COUNTS = struct.Struct("<IIII")
+    PLATFORM = struct.Struct("<iii")
+    SAW = struct.Struct("<ddi")
+    MOVING_SAW = struct.Struct("<ddddid")
+    CANNON = struct.Struct("<ddbddid")
+    MAGIC = b"LAVA"
+
+    def save(self, path):
+        parts = [
+            self.HEADER.pack(self.MAGIC, LEVEL_FORMAT_VERSION, self.idx, self.seed),
+            self.WORLD.pack(
+                self.height,
+                self.spawn[0],
+                self.spawn[1],
+                self.lava_y,
+                self.lava_speed,
+                self.door.rect.x,
+                self.door.rect.bottom,
+                self.door.rect.w,
+                self.door.rect.h,
+            ),
+            self.COUNTS.pack(
+                len(self.platforms), len(self.saws), len(self.moving_saws), len(self.cannons)
+            ),
+        ]
+        for p in self.platforms:
+            parts.append(self.PLATFORM.pack(p.rect.x, p.rect.y, p.rect.w))
         for s in self.saws:
-            s.update(dt)
+            parts.append(self.SAW.pack(s.x, s.y, s.r))
         for ms in self.moving_saws:
-            ms.update(dt)
+            parts.append(self.MOVING_SAW.pack(ms.ax, ms.ay, ms.bx, ms.by, ms.r, ms.speed))
         for c in self.cannons:
-            c.update(dt, self.projectiles)
-        for pr in self.projectiles:
-            pr.update(dt)
-        self.projectiles = [p for p in self.projectiles if p.alive]
+            parts.append(
+                self.CANNON.pack(c.x, c.y, c.dir, c.cooldown, c.speed, c.radius, c.timer)
+            )
+        # unique per writer, the warm-up thread may race the main one
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(b"".join(parts))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path, idx=None, seed=None):
+        # fast path: map the file and unpack records in place, no generation.
+        # returns None if the file is missing, truncated or for another level
+        try:
+            with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return cls.from_buffer(mm, idx, seed)
+        except (OSError, ValueError, struct.error):
+            return None
+
+    @classmethod
+    def from_buffer(cls, buf, idx=None, seed=None):
+        magic, version, file_idx, file_seed = cls.HEADER.unpack_from(buf, 0)
+        if magic != cls.MAGIC or version != LEVEL_FORMAT_VERSION:
+            return None
+        if (idx is not None and idx != file_idx) or (seed is not None and seed != file_seed):
+            return None
+        off = cls.HEADER.size
+        height, sx, sy, lava_y, lava_speed, dx, dy, dw, dh = cls.WORLD.unpack_from(buf, off)
+        off += cls.WORLD.size
+        n_plat, n_saw, n_moving, n_cannon = cls.COUNTS.unpack_from(buf, off)
+        off += cls.COUNTS.size
+
+        def records(view, fmt, n):
+            nonlocal off
+            end = off + fmt.size * n
+            if end > len(view):
+                raise ValueError("truncated level file")
+            with view[off:end] as chunk:
+                rows = list(fmt.iter_unpack(chunk))
+            off = end
+            return rows
+
+        # released on every path, an mmap can't close while a view is exported
+        with memoryview(buf) as view:
+            plats = records(view, cls.PLATFORM, n_plat)
+            saws = records(view, cls.SAW, n_saw)
+            moving = records(view, cls.MOVING_SAW, n_moving)
+            cannons = records(view, cls.CANNON, n_cannon)
+
+        lvl = cls(file_idx, file_seed, build=False)
+        lvl.platforms = [Platform(x, y, w) for x, y, w in plats]
+        lvl.saws = [Saw(x, y, r) for x, y, r in saws]
+        lvl.moving_saws = [
+            MovingSaw(ax, ay, bx, by, r=r, speed=speed) for ax, ay, bx, by, r, speed in moving
+        ]
+        lvl.cannons = []
+        for x, y, d, cooldown, speed, radius, timer in cannons:
+            c = Cannon(x, y, direction=d, cooldown=cooldown, speed=speed, radius=radius)
+            c.timer = timer
+            lvl.cannons.append(c)
+        lvl.door = Door(dx, dy, dw, dh)
+        lvl.height = height
+        lvl.spawn = (sx, sy)
+        lvl.lava_y = lava_y
+        lvl.lava_speed = lava_speed
+        lvl.build_index()
+        return lvl
+
+    @classmethod
+    def cached(cls, idx, cache_dir=LEVEL_CACHE_DIR, seed=None):
+        seed = 100 + idx * 7 if seed is None else seed
+        path = os.path.join(cache_dir, f"level_{idx}_{seed}.bin")
+        lvl = cls.load(path, idx, seed)
+        if lvl is None:
+            lvl = cls(idx, seed)
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+                lvl.save(path)
+            except OSError:
+                pass
+        return lvl
+
+    def build_index(self):
+        self.platform_grid = SpatialGrid(self.platforms)
+        self.saw_grid = SpatialGrid(self.saws)
+        self.moving_saw_grid = SpatialGrid(self.moving_saws)
+        self.cannon_grid = SpatialGrid(self.cannons)
+        tops = [p.rect.top for p in self.platforms]
+        if self.door is not None:
+            tops.append(self.door.rect.top)
+        self.top_y = min(tops)
+        self.static_layer.invalidate()
+
+    def prepare_render(self):
+        # build every sprite this level draws so the first frames don't hitch
+        for s in self.saws:
+            saw_atlas.prepare(s.r)
+        for ms in self.moving_saws:
+            saw_atlas.prepare(ms.r)
+
+    def stream(self, cam_y):
+        # fixed levels are fully built up front
+        pass
+
+    def layout(self):
+        # fixed levels never change shape, so snapshots share them as they are
+        return None
+
+    def set_layout(self, layout):
+        pass
+
+    def moving_saws_in(self, top, bottom):
+        # moving saws whose path overlaps [top, bottom], placed at the clock
+        found = self.moving_saw_grid.query(top, bottom)
+        for ms in found:
+            ms.place(self.clock, self.prev_clock)
+        return found
+
+    def arm_cannons(self, focus_y):
+        # schedule cannons that came within range of focus_y (all with None)
+        if focus_y is None:
+            near = self.cannons
+        else:
+            near = self.cannon_grid.query(focus_y - CANNON_RANGE, focus_y + CANNON_RANGE)
+        for c in near:
+            if c not in self.armed and (focus_y is None or abs(c.y - focus_y) <= CANNON_RANGE):
+                self.armed.add(c)
+                heapq.heappush(self.fire_heap, (c.next_fire(self.prev_clock), self.fire_seq, c))
+                self.fire_seq += 1
+
+    def update(self, dt, focus_y=None):
+        # only the clock moves here; saws are evaluated from it on demand, and
+        # cannons fire off a heap that holds only those near focus_y (the
+        # player), so the cost follows what is around the player, not the level
+        self.prev_clock = self.clock
+        self.clock += dt
+        self.arm_cannons(focus_y)
+        heap = self.fire_heap
+        while heap and heap[0][0] <= self.clock:
+            _, seq, c = heapq.heappop(heap)
+            if focus_y is not None and abs(c.y - focus_y) > CANNON_RANGE:
+                # out of range: drop it until it comes back into range
+                self.armed.discard(c)
+                continue
+            c.fire(self.projectiles)
+            heapq.heappush(heap, (c.next_fire(self.clock), seq, c))
+        self.projectiles.update(dt)
 
         # lava rises
+        self.prev_lava_y = self.lava_y
         self.lava_speed *= self.lava_accel
         self.lava_y -= self.lava_speed * dt
 
-    def draw(self, surf, cam_y):
-        # background
-        surf.fill((22, 26, 40))
+    def draw(self, surf, cam_y, alpha=1.0):
+        # alpha blends moving things from the previous tick to the current one
+        view_top = cam_y - 64
+        view_bottom = cam_y + HEIGHT + 64
 
-        # platforms
-        for p in self.platforms:
-            p.draw(surf, cam_y)
+        # background, platforms and door
+        self.static_layer.draw(surf, cam_y)
 
-        # door
-        self.door.draw(surf, cam_y)
         # exit label
-        exit_lbl = pygame.font.SysFont(FONT_NAME, 22, bold=True).render("EXIT", True, WHITE)
-        surf.blit(
-            exit_lbl,
-            (self.door.rect.centerx - exit_lbl.get_width() // 2, self.door.rect.top - cam_y - 28),
-        )
+        if self.door is not None and quality.enabled("labels"):
+            exit_lbl = text_cache.render("EXIT", FONT_SMALL, WHITE, bold=True)
+            lbl_x = self.door.rect.centerx - exit_lbl.get_width() // 2
+            surf.blit(exit_lbl, (lbl_x, self.door.rect.top - cam_y - 28))
 
         # hazards
-        for s in self.saws:
-            s.draw(surf, cam_y)
-        for ms in self.moving_saws:
-            ms.draw(surf, cam_y)
-        for c in self.cannons:
+        angle = SAW_SPIN * lerp(self.prev_clock, self.clock, alpha)
+        for s in self.saw_grid.query(view_top, view_bottom):
+            s.draw(surf, cam_y, angle)
+        for ms in self.moving_saws_in(view_top, view_bottom):
+            ms.draw(surf, cam_y, angle, alpha)
+        for c in self.cannon_grid.query(view_top, view_bottom):
             c.draw(surf, cam_y)
-        for pr in self.projectiles:
-            pr.draw(surf, cam_y)
+        self.projectiles.draw(surf, cam_y, view_top, view_bottom, alpha)
 
         # lava
-        lava_h = max(0, int(HEIGHT - (self.lava_y - cam_y)))
+        lava_y = self.lava_y
+        if self.prev_lava_y is not None:
+            lava_y = lerp(self.prev_lava_y, lava_y, alpha)
+        lava_h = max(0, int(HEIGHT - (lava_y - cam_y)))
         if lava_h > 0:
             pygame.draw.rect(surf, LAVA_COLOR, pygame.Rect(0, HEIGHT - lava_h, WIDTH, lava_h))
-            for i in range(0, WIDTH, 40):
-                pygame.draw.circle(surf, (255, 180, 120), (i + 20, HEIGHT - lava_h), 12)
+            if quality.enabled("bubbles"):
+                for i in range(0, WIDTH, 40):
+                    pygame.draw.circle(surf, (255, 180, 120), (i + 20, HEIGHT - lava_h), 12)
+
+class EndlessLevel(Level):
+    # no door: rows are generated a chunk at a time ahead of the camera and
+    # everything far enough under the lava is dropped, so memory and per-frame
+    # cost stay bounded however high the player climbs
+    def __init__(self, seed=None):
+        super().__init__(ENDLESS_LEVEL, seed, rows=0)
+
+    def build(self):
+        self.platforms.append(Platform(0, 2000, WIDTH))
+        self.next_row = 0
+        self.next_y = 1800
+        self.spawn = (WIDTH // 2 - PLAYER_W // 2, 2000 - PLAYER_H - 2)
+        self.lava_y = 2050
+        self.lava_speed = 40 + 12 * self.idx
+        self.height = self.lava_y + HEIGHT
+        self.projectiles.y_min = -math.inf
+        self.build_index()
+        self.stream(self.spawn[1] - HEIGHT)
+
+    def stream(self, cam_y):
+        if self.next_y > cam_y - ENDLESS_AHEAD:
+            self.generate(cam_y - ENDLESS_AHEAD)
+        limit = self.lava_y + ENDLESS_EVICT_BELOW
+        for items, grid in (
+            (self.platforms, self.platform_grid),
+            (self.saws, self.saw_grid),
+            (self.moving_saws, self.moving_saw_grid),
+            (self.cannons, self.cannon_grid),
+        ):
+            self.evict(items, grid, limit)
+        self.projectiles.y_max = limit
+        # the camera never needs to look further down than the evicted floor
+        self.height = limit
+
+    def generate(self, target_y):
+        start = [len(self.platforms), len(self.saws), len(self.moving_saws), len(self.cannons)]
+        bottom = self.next_y + PLATFORM_H
+        while self.next_y > target_y:
+            for _ in range(ENDLESS_CHUNK_ROWS):
+                self.add_row(self.next_row, self.next_y)
+                self.next_row += 1
+                self.next_y -= 180 - 10 * self.idx
+        for items, grid, first in zip(
+            (self.platforms, self.saws, self.moving_saws, self.cannons),
+            (self.platform_grid, self.saw_grid, self.moving_saw_grid, self.cannon_grid),
+            start,
+        ):
+            for item in items[first:]:
+                grid.insert(item)
+        self.top_y = min(p.rect.top for p in self.platforms[start[0]:])
+        self.static_layer.invalidate_range(self.top_y, bottom)
+
+    def layout(self):
+        # streaming changes the entity lists, so snapshots keep their own
+        # copies; the entities themselves are still shared
+        return (
+            tuple(self.platforms),
+            tuple(self.saws),
+            tuple(self.moving_saws),
+            tuple(self.cannons),
+            self.next_row,
+            self.next_y,
+            self.height,
+            self.top_y,
+            self.projectiles.y_max,
+        )
+
+    def set_layout(self, layout):
+        platforms, saws, moving_saws, cannons = layout[:4]
+        changed = False
+        for items, saved in zip(
+            (self.platforms, self.saws, self.moving_saws, self.cannons),
+            (platforms, saws, moving_saws, cannons),
+        ):
+            # lists only grow at the end and shrink at the front, so length
+            # and both ends tell whether anything streamed in or out
+            if len(items) != len(saved) or (
+                saved and (items[0] is not saved[0] or items[-1] is not saved[-1])
+            ):
+                changed = True
+                break
+        if changed:
+            self.platforms = list(platforms)
+            self.saws = list(saws)
+            self.moving_saws = list(moving_saws)
+            self.cannons = list(cannons)
+            self.build_index()
+        self.next_row, self.next_y, self.height, self.top_y, self.projectiles.y_max = layout[4:]
+
+    def evict(self, items, grid, limit):
+        # rows are generated bottom up, so the lowest entities are at the front
+        k = 0
+        while k < len(items) and items[k].extent()[0] > limit:
+            grid.remove(items[k])
+            k += 1
+        if k:
+            # everything from the new floor down to the lowest evicted entity
+            bottom = items[0].extent()[1]
+            del items[:k]
+            self.static_layer.invalidate_range(limit, bottom)
 
 # ---------------------------------------
-# Game
+# Simulation
 # ---------------------------------------
-class Game:
-    def __init__(self):
-        pygame.init()
-        pygame.display.set_caption("Escape the Lava!")
-        self.screen = pygame.display.set_mode((WIDTH, HEIGHT))
-        self.clock = pygame.time.Clock()
-        self.font_big = pygame.font.SysFont(FONT_NAME, 64, bold=True)
-        self.font = pygame.font.SysFont(FONT_NAME, 28)
-        self.font_small = pygame.font.SysFont(FONT_NAME, 22)
+class LevelPrefetch:
+    # builds a level on a worker thread together with what its first frame
+    # needs: grids, saw sprites and, with a display up, the static chunks
+    # around the spawn. the level is only handed over once it is complete.
+    # with `after` the worker waits for that event before it starts
+    def __init__(self, sim, idx, seed=None, after=None):
+        self.key = (idx, seed)
+        self.sim = sim
+        self.after = after
+        self.level = None
+        self.thread = threading.Thread(target=self.run, name=f"prefetch-{idx}", daemon=True)
+        self.thread.start()
 
+    def run(self):
+        # a failed build leaves level unset and start_level builds it again on
+        # the main thread, where the error is raised if it happens again
+        if self.after is not None:
+            self.after.wait()
+        try:
+            lvl = self.sim.build_level(*self.key)
+            lvl.prepare_render()
+            target = pygame.display.get_surface() if pygame.display.get_init() else None
+            if target is not None:
+                lvl.static_layer.prepare(lvl.spawn[1] - HEIGHT * 0.6, target)
+        except Exception:
+            return
+        self.level = lvl
+
+    def take(self):
+        # only blocks if the player reached the door before the worker finished,
+        # None if the worker failed or hasn't been let start yet
+        if self.after is not None and not self.after.is_set():
+            return None
+        self.thread.join()
+        return self.level
+
+class Simulation:
+    # pure game state and physics, no display, clock or event queue needed
+    def __init__(self, level_cache=None, prefetch=False):
+        self.level_cache = level_cache
+        # with prefetch on, the next level is built on a worker thread while
+        # the current one is played and swapped in at the door
+        self.prefetch = prefetch
+        self.pending = None
         self.state = STATE_MENU
         self.level_idx = 0
         self.level = None
         self.player = None
         self.lives = 3
         self.cam_y = 0.0
+        self.prev_cam_y = 0.0
+        self.profiler = None
 
-    def start_level(self, idx):
+    def build_level(self, idx, seed=None):
+        if idx == ENDLESS_LEVEL:
+            return EndlessLevel(seed)
+        if self.level_cache:
+            return Level.cached(idx, self.level_cache, seed)
+        return Level(idx, seed)
+
+    def start_level(self, idx, seed=None):
         self.level_idx = idx
-        self.level = Level(idx)
+        pending = self.pending
+        self.pending = None
+        self.level = None
+        if pending is not None and pending.key == (idx, seed):
+            self.level = pending.take()
+        if self.level is None:
+            self.level = self.build_level(idx, seed)
+        if self.prefetch and idx + 1 < LEVEL_COUNT:
+            self.pending = LevelPrefetch(self, idx + 1)
         self.player = Player(*self.level.spawn)
         self.cam_y = self.player.rect.y - HEIGHT * 0.6
+        self.prev_cam_y = self.cam_y
         if idx == 0:
             self.lives = 5
         elif idx == 1:
@@ -401,58 +1357,137 @@ class Game:
             self.lives = 3
         self.state = STATE_PLAY
 
+    def step(self, inputs, dt=SIM_DT):
+        # one simulation tick. the game always passes SIM_DT, which replays
+        # bit for bit; a multiple of it is a coarse step for headless tools,
+        # close to that many ticks but not identical to them
+        if self.state != STATE_PLAY:
+            return
+        prof = self.profiler
+        self.prev_cam_y = self.cam_y
+        if inputs.jump_pressed:
+            self.player.try_jump()
+        self.player.update(dt, inputs)
+        if prof is not None:
+            prof.mark("player")
+        self.level.update(dt, self.player.rect.centery)
+        if prof is not None:
+            prof.mark("level")
+        self.handle_collisions(dt)
+        if prof is not None:
+            prof.mark("collisions")
+        self.update_camera(dt)
+        self.level.stream(self.cam_y)
+        if prof is not None:
+            prof.mark("camera")
+
+    def snapshot(self):
+        return Snapshot(self)
+
+    def restore(self, snap):
+        snap.restore(self)
+
+    def play(self, replay, on_tick=None):
+        # re-run a recorded session as fast as possible, returns the end checksum
+        self.start_level(replay.level_idx, replay.seed)
+        for inputs, dt in replay:
+            self.step(inputs, dt)
+            if on_tick is not None:
+                on_tick(self)
+        return self.checksum()
+
+    def checksum(self):
+        p = self.player
+        lvl = self.level
+        state = struct.pack(
+            "<iiddiddddiii8sdd",
+            p.rect.x,
+            p.rect.y,
+            p.velx,
+            p.vely,
+            p.on_ground,
+            p.coyote_timer,
+            p.jump_buffer_timer,
+            p.invuln_timer,
+            self.cam_y,
+            p.facing,
+            self.lives,
+            self.level_idx,
+            self.state.encode(),
+            lvl.lava_y,
+            lvl.lava_speed,
+        )
+        return zlib.crc32(state)
+
     def handle_collisions(self, dt):
         p = self.player
         lvl = self.level
 
-        # move X with collision
-        p.rect.x += int(p.velx)
-        for plat in lvl.platforms:
-            if p.rect.colliderect(plat.rect):
+        start = p.rect.copy()
+        ticks = dt / SIM_DT
+
+        # move X with collision, stopping at the first wall the rect sweeps into
+        dx = int(p.velx * ticks)
+        r = p.rect
+        left = r.left + min(dx, 0)
+        right = r.right + max(dx, 0)
+        r.x += dx
+        for plat in lvl.platform_grid.query(r.top, r.bottom):
+            pr = plat.rect
+            if pr.left < right and pr.right > left and pr.top < r.bottom and pr.bottom > r.top:
                 if p.velx > 0:
-                    p.rect.right = plat.rect.left
+                    r.right = min(r.right, pr.left)
                 elif p.velx < 0:
-                    p.rect.left = plat.rect.right
+                    r.left = max(r.left, pr.right)
 
-        # move Y with collision
+        # move Y with collision, same sweep so fast falls can't tunnel
         p.on_ground = False
-        p.rect.y += int(p.vely)
-        for plat in lvl.platforms:
-            if p.rect.colliderect(plat.rect):
-                if p.vely > 0:
-                    p.rect.bottom = plat.rect.top
-                    p.vely = 0
+        # over a coarse step the velocity ramps from start_vely, so the ticks
+        # it covers would have moved this far; a plain tick is just int(vely)
+        dy = int(p.vely * ticks - (p.vely - p.start_vely) * (ticks - 1.0) / 2.0)
+        top = r.top + min(dy, 0)
+        bottom = r.bottom + max(dy, 0)
+        r.y += dy
+        # resolve along the way the rect actually moved: over a coarse step it
+        # can still be rising when vely has already turned
+        going = dy if dy else p.vely
+        for plat in lvl.platform_grid.query(top, bottom):
+            pr = plat.rect
+            if pr.left < r.right and pr.right > r.left and pr.top < bottom and pr.bottom > top:
+                if going > 0:
+                    r.bottom = min(r.bottom, pr.top)
+                    p.vely = going = 0
                     p.on_ground = True
                     p.coyote_timer = COYOTE_TIME
-                elif p.vely < 0:
-                    p.rect.top = plat.rect.bottom
-                    p.vely = 0
-
-        # door touch
-        if p.rect.colliderect(lvl.door.rect):
-            self.level_idx += 1
-            if self.level_idx >= 3:
-                self.state = STATE_WIN
+                elif going < 0:
+                    r.top = max(r.top, pr.bottom)
+                    p.vely = going = 0
+        swept = start.union(r)
+        moved_x = r.x - start.x
+        moved_y = r.y - start.y
+
+        # door touch, anywhere along the step counts
+        if lvl.door is not None and swept.colliderect(lvl.door.rect):
+            if self.level_idx + 1 < LEVEL_COUNT:
+                self.start_level(self.level_idx + 1)
             else:
-                self.start_level(self.level_idx)
+                self.state = STATE_WIN
             return
 
-        # hazards
+        # hazards, swept relative to the player against its end rect, so only
+        # paths that really meet count; the union box only narrows the query
         hit = False
-        for s in lvl.saws:
-            if s.collides(p.rect):
+        for s in lvl.saw_grid.query(swept.top, swept.bottom):
+            if s.collides_swept(r, moved_x, moved_y):
                 hit = True
                 break
         if not hit:
-            for ms in lvl.moving_saws:
-                if ms.collides(p.rect):
-                    hit = True
-                    break
-        if not hit:
-            for pr in lvl.projectiles:
-                if pr.collides(p.rect):
+            for ms in lvl.moving_saws_in(swept.top, swept.bottom):
+                if ms.collides_swept(r, moved_x, moved_y):
                     hit = True
                     break
+        if not hit and lvl.projectiles.collides_swept(r, moved_x, moved_y):
+            hit = True
 
         # lava
         if p.rect.bottom > lvl.lava_y:
@@ -474,6 +1509,9 @@ class Game:
                     safe_y = lvl.spawn[1]
                 p.rect.x = clamp(p.rect.x, 20, WIDTH - 20 - PLAYER_W)
                 p.rect.y = safe_y
+                # teleport, don't interpolate across it
+                p.prev_x = p.rect.x
+                p.prev_y = p.rect.y
                 p.vely = 0
                 p.invuln_timer = 1.2
 
@@ -485,83 +1523,565 @@ class Game:
         self.cam_y += (target_y - self.cam_y) * min(1.0, 10.0 * dt)
 
         # dynamic lower bound so the camera can travel to the real top
-        tops = [pl.rect.top for pl in self.level.platforms]
-        tops.append(self.level.door.rect.top)
-        lower_bound = min(tops) - 200
+        lower_bound = self.level.top_y - 200
         self.cam_y = clamp(self.cam_y, lower_bound, self.level.height)
 
-    def draw_hud(self):
-        lives_text = self.font.render(f"Lives: {self.lives}", True, WHITE)
-        level_text = self.font.render(f"Level: {self.level_idx + 1}/3", True, WHITE)
-        self.screen.blit(lives_text, (16, 12))
-        self.screen.blit(level_text, (WIDTH - level_text.get_width() - 16, 12))
 
-        tip = self.font_small.render(
+class Snapshot:
+    # immutable copy of everything Simulation.step can change, taken after
+    # start_level. the level is held by reference: its geometry is static and
+    # hazards are functions of its clock, so only the values packed here move.
+    # capture and restore cost microseconds and can be branched from at will
+    __slots__ = (
+        "level",
+        "level_idx",
+        "state",
+        "lives",
+        "cam",
+        "player",
+        "lava",
+        "clock",
+        "fire_heap",
+        "shots",
+        "rng",
+        "layout",
+    )
+
+    def __init__(self, sim):
+        lvl = sim.level
+        p = sim.player
+        pool = lvl.projectiles
+        n = pool.n
+        self.level = lvl
+        self.level_idx = sim.level_idx
+        self.state = sim.state
+        self.lives = sim.lives
+        self.cam = (sim.cam_y, sim.prev_cam_y)
+        self.player = (
+            p.rect.x,
+            p.rect.y,
+            p.velx,
+            p.vely,
+            p.on_ground,
+            p.coyote_timer,
+            p.jump_buffer_timer,
+            p.invuln_timer,
+            p.facing,
+            p.prev_x,
+            p.prev_y,
+        )
+        self.lava = (lvl.lava_y, lvl.lava_speed, lvl.prev_lava_y)
+        self.clock = (lvl.clock, lvl.prev_clock, lvl.fire_seq)
+        self.fire_heap = tuple(lvl.fire_heap)
+        columns = (pool.x, pool.y, pool.vx, pool.vy, pool.px, pool.py, pool.r)
+        self.shots = (n,) + tuple(col[:n].tobytes() for col in columns)
+        self.rng = lvl.rng.getstate()
+        self.layout = lvl.layout()
+
+    def restore(self, sim):
+        lvl = self.level
+        sim.level = lvl
+        sim.level_idx = self.level_idx
+        sim.state = self.state
+        sim.lives = self.lives
+        sim.cam_y, sim.prev_cam_y = self.cam
+
+        if sim.player is None:
+            sim.player = Player(*lvl.spawn)
+        p = sim.player
+        (
+            p.rect.x,
+            p.rect.y,
+            p.velx,
+            p.vely,
+            p.on_ground,
+            p.coyote_timer,
+            p.jump_buffer_timer,
+            p.invuln_timer,
+            p.facing,
+            p.prev_x,
+            p.prev_y,
+        ) = self.player
+
+        lvl.set_layout(self.layout)
+        lvl.lava_y, lvl.lava_speed, lvl.prev_lava_y = self.lava
+        lvl.clock, lvl.prev_clock, lvl.fire_seq = self.clock
+        lvl.fire_heap = list(self.fire_heap)
+        lvl.armed = {c for _, _, c in self.fire_heap}
+
+        pool = lvl.projectiles
+        n = self.shots[0]
+        while pool.capacity < n:
+            pool.grow()
+        for col, data in zip(
+            (pool.x, pool.y, pool.vx, pool.vy, pool.px, pool.py, pool.r), self.shots[1:]
+        ):
+            col[:n] = array(col.typecode, data)
+        pool.n = n
+        lvl.rng.setstate(self.rng)
+
+# ---------------------------------------
+# Replays
+# ---------------------------------------
+class Replay:
+    # a session as run-length encoded (count, input flags) records of fixed
+    # simulation ticks, plus the level and seed it started on and the tick
+    # rate, so playback reproduces the recorded physics bit for bit. the
+    # physics is only exact at SIM_HZ, so other rates are refused on load
+    HEADER = struct.Struct("<4sHHqHIII")
+    RUN = struct.Struct("<HB")
+    MAGIC = b"LRPL"
+    VERSION = 3
+
+    def __init__(self, level_idx, seed):
+        self.level_idx = level_idx
+        self.seed = seed
+        self.hz = SIM_HZ
+        self.runs = []
+        self.ticks = 0
+        self.checksum = 0
+
+    def record(self, inputs):
+        flags = inputs.flags()
+        if self.runs:
+            count, last_flags = self.runs[-1]
+            if last_flags == flags and count < 0xFFFF:
+                self.runs[-1] = (count + 1, flags)
+                self.ticks += 1
+                return
+        self.runs.append((1, flags))
+        self.ticks += 1
+
+    def __iter__(self):
+        for count, flags in self.runs:
+            inputs = Inputs.from_flags(flags)
+            for _ in range(count):
+                yield inputs, SIM_DT
+
+    def save(self, path):
+        parts = [
+            self.HEADER.pack(
+                self.MAGIC,
+                self.VERSION,
+                self.level_idx,
+                self.seed,
+                self.hz,
+                self.ticks,
+                self.checksum,
+                len(self.runs),
+            )
+        ]
+        parts.extend(self.RUN.pack(*run) for run in self.runs)
+        with open(path, "wb") as f:
+            f.write(b"".join(parts))
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        magic, version, idx, seed, hz, ticks, checksum, n_runs = cls.HEADER.unpack_from(data, 0)
+        if magic != cls.MAGIC or version != cls.VERSION:
+            raise ValueError(f"{path} is not a version {cls.VERSION} replay")
+        if hz != SIM_HZ:
+            raise ValueError(f"{path} was recorded at {hz} Hz, the simulation runs at {SIM_HZ} Hz")
+        replay = cls(idx, seed)
+        end = cls.HEADER.size + cls.RUN.size * n_runs
+        replay.runs = list(cls.RUN.iter_unpack(data[cls.HEADER.size:end]))
+        replay.ticks = ticks
+        replay.checksum = checksum
+        return replay
+
+# ---------------------------------------
+# Profiling
+# ---------------------------------------
+class FrameProfiler:
+    # wall time per stage of the last PROFILE_FRAMES played frames, in ms,
+    # kept in one ring buffer column per stage
+    def __init__(self, frames=PROFILE_FRAMES, stages=PROFILE_STAGES):
+        self.frames = frames
+        self.stages = stages
+        self.index = {name: i for i, name in enumerate(stages)}
+        self.columns = [array("d", bytes(8 * frames)) for _ in stages]
+        self.totals = array("d", bytes(8 * frames))
+        self.current = [0.0] * len(stages)
+        self.head = 0
+        self.count = 0
+        self.t = 0.0
+
+    def begin(self):
+        for i in range(len(self.current)):
+            self.current[i] = 0.0
+        self.t = time.perf_counter()
+
+    def mark(self, stage):
+        # charge the time since the previous mark to this stage
+        now = time.perf_counter()
+        self.current[self.index[stage]] += (now - self.t) * 1000.0
+        self.t = now
+
+    def end(self):
+        h = self.head
+        total = 0.0
+        for i, ms in enumerate(self.current):
+            self.columns[i][h] = ms
+            total += ms
+        self.totals[h] = total
+        self.head = (h + 1) % self.frames
+        self.count = min(self.count + 1, self.frames)
+
+    def recent(self, n):
+        # ring indexes of the last n frames, oldest first
+        n = min(n, self.count)
+        return [(self.head - n + k) % self.frames for k in range(n)]
+
+    def averages(self, n=60):
+        idx = self.recent(n)
+        if not idx:
+            return [0.0] * len(self.stages), 0.0, 0.0
+        avg = [sum(col[i] for i in idx) / len(idx) for col in self.columns]
+        totals = [self.totals[i] for i in idx]
+        return avg, sum(totals) / len(totals), max(totals)
+
+    def dump_csv(self, path):
+        with open(path, "w") as f:
+            f.write("frame," + ",".join(self.stages) + ",total\n")
+            for n, i in enumerate(self.recent(self.frames)):
+                row = [f"{col[i]:.4f}" for col in self.columns]
+                f.write(f"{n},{','.join(row)},{self.totals[i]:.4f}\n")
+
+class ProfilerOverlay:
+    # frame-time graph against the render rate's budget plus a per-stage
+    # breakdown. the text panel is re-rendered a few times a second
+    def __init__(self, profiler, width=300, graph_h=80, fps=FPS):
+        self.profiler = profiler
+        self.fps = fps
+        self.width = width
+        self.graph_h = graph_h
+        self.panel = None
+        self.frames_since_panel = 0
+
+    def render_panel(self):
+        prof = self.profiler
+        avg, total_avg, total_max = prof.averages()
+        font = text_cache.font(14, name=PROFILE_FONT)
+        lines = [f"frame {total_avg:5.2f} ms avg  {total_max:5.2f} ms max"]
+        mode = "auto" if quality.pinned is None else "pinned"
+        lines.append(f"quality {quality.tier} ({mode})")
+        lines += [f"{name:<11}{ms:6.2f} ms" for name, ms in zip(prof.stages, avg)]
+        line_h = font.get_linesize()
+        panel = pygame.Surface((self.width, line_h * len(lines) + 8), pygame.SRCALPHA)
+        panel.fill((0, 0, 0, 170))
+        for k, line in enumerate(lines):
+            panel.blit(font.render(line, True, WHITE), (6, 4 + k * line_h))
+        self.panel = panel
+
+    def draw(self, surf):
+        prof = self.profiler
+        if self.panel is None or self.frames_since_panel >= self.fps // 4:
+            self.render_panel()
+            self.frames_since_panel = 0
+        self.frames_since_panel += 1
+
+        x0 = WIDTH - self.width - 8
+        y0 = HEIGHT - self.graph_h - self.panel.get_height() - 16
+        surf.blit(self.panel, (x0, y0))
+
+        gy = y0 + self.panel.get_height() + 4
+        pygame.draw.rect(surf, BLACK, pygame.Rect(x0, gy, self.width, self.graph_h))
+        budget = 1000.0 / self.fps
+        scale = self.graph_h / (budget * 2)
+        recent = prof.recent(self.width)
+        left = x0 + self.width - len(recent)
+        for k, i in enumerate(recent):
+            ms = prof.totals[i]
+            h = min(self.graph_h, int(ms * scale))
+            color = RED if ms > budget else GREEN
+            x = left + k
+            pygame.draw.line(surf, color, (x, gy + self.graph_h), (x, gy + self.graph_h - h))
+        budget_y = gy + self.graph_h - int(budget * scale)
+        pygame.draw.line(surf, YELLOW, (x0, budget_y), (x0 + self.width, budget_y))
+
+# ---------------------------------------
+# Game
+# ---------------------------------------
+def draw_hud(surf, sim):
+    # any surface will do, offline renders draw onto their own
+    lives_text = text_cache.render(f"Lives: {sim.lives}", FONT_MED, WHITE)
+    if isinstance(sim.level, EndlessLevel):
+        climbed = max(0, (sim.level.spawn[1] - sim.player.rect.y) // 10)
+        level_text = text_cache.render(f"Endless: {climbed} m", FONT_MED, WHITE)
+    else:
+        level_text = text_cache.render(
+            f"Level: {sim.level.idx + 1}/{LEVEL_COUNT}", FONT_MED, WHITE
+        )
+    surf.blit(lives_text, (16, 12))
+    surf.blit(level_text, (WIDTH - level_text.get_width() - 16, 12))
+
+    if quality.enabled("tip"):
+        tip = text_cache.render(
             "Move A or Left and D or Right. Jump Space or W or Up",
-            True,
+            FONT_SMALL,
             WHITE,
         )
-        self.screen.blit(tip, (WIDTH // 2 - tip.get_width() // 2, 12 + 30))
+        surf.blit(tip, (WIDTH // 2 - tip.get_width() // 2, 12 + 30))
+
+class Game:
+    FONTS = (
+        (FONT_BIG, True, FONT_NAME),
+        (FONT_MED, False, FONT_NAME),
+        (FONT_SMALL, False, FONT_NAME),
+        (FONT_SMALL, True, FONT_NAME),
+        (14, False, PROFILE_FONT),
+    )
+
+    def __init__(
+        self,
+        record_path=None,
+        replay=None,
+        profile=False,
+        fps=FPS,
+        fast_start=False,
+        quality_tier=None,
+    ):
+        self.first_frame_ms = None
+        self.warm_ms = None
+        self.warmup = None
+        self.presented = threading.Event()
+        if fast_start:
+            # only what the menu needs: no audio, joystick or other subsystems
+            pygame.display.init()
+            pygame.font.init()
+        else:
+            pygame.init()
+        pygame.display.set_caption("Escape the Lava!")
+        self.screen = pygame.display.set_mode((WIDTH, HEIGHT))
+        self.clock = pygame.time.Clock()
+        if fast_start:
+            # show the menu in the stand-in font straight away and swap in the
+            # real fonts when the warm-up thread has them
+            text_cache.load_fallback(self.FONTS)
+            self.warmup = threading.Thread(target=self.warm_up, name="warmup", daemon=True)
+            self.warmup.start()
+        else:
+            # load every font up front so no frame pays for a SysFont lookup
+            text_cache.load(self.FONTS)
+
+        self.sim = Simulation(level_cache=LEVEL_CACHE_DIR, prefetch=True)
+        if fast_start:
+            # level 0 is built once the first frame is up and handed over when
+            # it is started from the menu, like the next level at a door
+            self.sim.pending = LevelPrefetch(self.sim, 0, after=self.presented)
+        self.rendered_level = None
+        # render rate only; the simulation runs at SIM_HZ and the leftover
+        # fraction of a tick is drawn by interpolating between the last two
+        self.fps = fps
+        quality.budget = 1000.0 / fps
+        # None lets the governor choose the quality tier
+        quality.pin(quality_tier)
+        self.accumulator = 0.0
+        self.pending_jump = False
+        # menu, death and win screens are drawn once and then the loop
+        # blocks on the event queue instead of redrawing at FPS
+        self.idle_wait = True
+        self.presented_state = None
+
+        # finished sessions are written to record_path; a replay is played
+        # back in real time in place of the keyboard
+        self.record_path = record_path
+        self.recording = None
+        self.playback = None
+        if replay is not None:
+            self.sim.start_level(replay.level_idx, replay.seed)
+            self.playback = iter(replay)
+
+        # F3 toggles the profiler overlay, F4 dumps its frames to CSV, F5 steps
+        # through pinned quality tiers and back to automatic
+        self.profiler = FrameProfiler()
+        self.overlay = ProfilerOverlay(self.profiler, fps=fps)
+        self.profiling = False
+        if profile:
+            self.toggle_profiling()
+
+    def warm_up(self):
+        # fonts first since the menu is waiting on them, then the level files
+        # and saw sprites of the other levels so starting them doesn't hitch
+        # either; the levels themselves aren't kept, level 0 is prefetched.
+        # the CPU-bound part holds off until the first frame is up
+        try:
+            text_cache.load(self.FONTS)
+        finally:
+            text_cache.fallback = False
+            pygame.event.post(pygame.event.Event(FONTS_READY))
+        self.presented.wait()
+        for idx in range(1, LEVEL_COUNT):
+            Level.cached(idx, LEVEL_CACHE_DIR).prepare_render()
+        self.warm_ms = (time.perf_counter() - START_TIME) * 1000.0
+
+    def toggle_profiling(self):
+        self.profiling = not self.profiling
+        self.sim.profiler = self.profiler if self.profiling else None
+
+    def draw_hud(self):
+        draw_hud(self.screen, self.sim)
 
     def run(self):
         while True:
-            dt = self.clock.tick(FPS) / 1000.0
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
-                if self.state == STATE_MENU:
-                    if event.type == pygame.KEYDOWN:
-                        if event.key in (pygame.K_1, pygame.K_RETURN, pygame.K_SPACE):
-                            self.start_level(0)
-                        elif event.key == pygame.K_2:
-                            self.start_level(1)
-                        elif event.key == pygame.K_3:
-                            self.start_level(2)
-                elif self.state == STATE_PLAY:
-                    if event.type == pygame.KEYDOWN:
-                        if event.key in (pygame.K_SPACE, pygame.K_w, pygame.K_UP):
-                            self.player.try_jump()
-                        if event.key == pygame.K_ESCAPE:
-                            self.state = STATE_MENU
-                elif self.state in (STATE_DEAD, STATE_WIN):
-                    if event.type == pygame.KEYDOWN:
-                        if event.key in (pygame.K_RETURN, pygame.K_SPACE):
-                            self.state = STATE_MENU
-
-            if self.state == STATE_MENU:
-                self.draw_menu()
-            elif self.state == STATE_PLAY:
-                self.update_play(dt)
-            elif self.state == STATE_DEAD:
-                self.draw_dead()
-            elif self.state == STATE_WIN:
-                self.draw_win()
-
-            pygame.display.flip()
-
-    def update_play(self, dt):
-        keys = pygame.key.get_pressed()
-        self.player.update(dt, keys)
-        self.level.update(dt)
-        self.handle_collisions(dt)
-        self.update_camera(dt)
+            self.frame()
+
+    def frame(self):
+        sim = self.sim
+        if self.idle_wait and sim.state != STATE_PLAY and self.presented_state == sim.state:
+            # static screen is already on display, sleep until something happens
+            events = [pygame.event.wait(IDLE_WAIT_MS)]
+            events += pygame.event.get()
+            self.clock.tick()
+            ms = 1000 // self.fps
+        elif self.first_frame_ms is None:
+            # nothing to pace the first frame against, don't wait on it
+            ms = self.clock.tick()
+            events = pygame.event.get()
+        else:
+            ms = self.clock.tick(self.fps)
+            events = pygame.event.get()
+        prof = self.profiler if self.profiling else None
+        if prof is not None:
+            prof.begin()
+
+        jump_pressed = False
+        for event in events:
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                sys.exit()
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_F3:
+                    self.toggle_profiling()
+                elif event.key == pygame.K_F4 and self.profiler.count:
+                    self.profiler.dump_csv(time.strftime("profile_%Y%m%d_%H%M%S.csv"))
+                elif event.key == pygame.K_F5:
+                    pinned = quality.pinned
+                    if pinned is None:
+                        quality.pin(0)
+                    elif pinned + 1 < len(QUALITY_TIERS):
+                        quality.pin(pinned + 1)
+                    else:
+                        quality.pin(None)
+            if event.type in (pygame.WINDOWEXPOSED, FONTS_READY):
+                self.presented_state = None
+            if sim.state == STATE_MENU:
+                if event.type == pygame.KEYDOWN:
+                    if event.key in (pygame.K_1, pygame.K_RETURN, pygame.K_SPACE):
+                        self.start_level(0)
+                    elif event.key == pygame.K_2:
+                        self.start_level(1)
+                    elif event.key == pygame.K_3:
+                        self.start_level(2)
+                    elif event.key == pygame.K_e:
+                        self.start_level(ENDLESS_LEVEL)
+            elif sim.state == STATE_PLAY:
+                if event.type == pygame.KEYDOWN:
+                    if event.key in (pygame.K_SPACE, pygame.K_w, pygame.K_UP):
+                        jump_pressed = True
+                    if event.key == pygame.K_ESCAPE:
+                        self.stop_level()
+            elif sim.state in (STATE_DEAD, STATE_WIN):
+                if event.type == pygame.KEYDOWN:
+                    if event.key in (pygame.K_RETURN, pygame.K_SPACE):
+                        sim.state = STATE_MENU
+
+        played = sim.state == STATE_PLAY
+        if played:
+            quality.update(ms, self.clock.get_rawtime())
+            self.update_play(ms, jump_pressed)
+            if prof is not None:
+                self.overlay.draw(self.screen)
+                prof.mark("overlay")
+        elif self.idle_wait and self.presented_state == sim.state:
+            return
+        elif sim.state == STATE_MENU:
+            self.draw_menu()
+        elif sim.state == STATE_DEAD:
+            self.draw_dead()
+        elif sim.state == STATE_WIN:
+            self.draw_win()
+
+        pygame.display.flip()
+        self.presented_state = sim.state
+        if self.first_frame_ms is None:
+            self.first_frame_ms = (time.perf_counter() - START_TIME) * 1000.0
+            self.presented.set()
+        if played and prof is not None:
+            prof.mark("flip")
+            prof.end()
 
-        # draw world
-        self.level.draw(self.screen, self.cam_y)
-        self.player.draw(self.screen, self.cam_y)
+    def start_level(self, idx):
+        self.sim.start_level(idx)
+        self.accumulator = 0.0
+        self.pending_jump = False
+        if self.record_path:
+            self.recording = Replay(idx, self.sim.level.seed)
+
+    def stop_level(self):
+        if self.recording is not None:
+            self.recording.checksum = self.sim.checksum()
+            self.recording.save(self.record_path)
+            self.recording = None
+        self.playback = None
+        if self.sim.state == STATE_PLAY:
+            self.sim.state = STATE_MENU
+
+    def update_play(self, ms, jump_pressed=False):
+        sim = self.sim
+        # a press is held over until a tick runs, so frames faster than the
+        # tick rate can't drop it
+        self.pending_jump = self.pending_jump or jump_pressed
+        self.accumulator = min(self.accumulator + ms / 1000.0, SIM_DT * SIM_MAX_STEPS)
+        while self.accumulator >= SIM_DT:
+            self.accumulator -= SIM_DT
+            if self.playback is not None:
+                inputs, dt = next(self.playback, (None, 0.0))
+                if inputs is None:
+                    self.stop_level()
+                    return
+            else:
+                inputs = Inputs.from_keys(pygame.key.get_pressed(), self.pending_jump)
+                dt = SIM_DT
+                if self.recording is not None:
+                    self.recording.record(inputs)
+            self.pending_jump = False
+            if sim.profiler is not None:
+                sim.profiler.mark("input")
+            sim.step(inputs, dt)
+            if sim.state != STATE_PLAY:
+                self.stop_level()
+                break
+        self.draw_world(self.accumulator / SIM_DT)
+
+    def draw_world(self, alpha=1.0):
+        sim = self.sim
+        if sim.level is not self.rendered_level:
+            sim.level.prepare_render()
+            self.rendered_level = sim.level
+        prof = sim.profiler
+        cam_y = lerp(sim.prev_cam_y, sim.cam_y, alpha)
+        sim.level.draw(self.screen, cam_y, alpha)
+        if prof is not None:
+            prof.mark("draw")
+        sim.player.draw(self.screen, cam_y, alpha)
         self.draw_hud()
+        if prof is not None:
+            prof.mark("hud")
 
     def draw_menu(self):
         self.screen.fill((16, 18, 28))
-        title = self.font_big.render("Escape the Lava!", True, WHITE)
-        sub = self.font.render("Upward jumping with lava, saws, and cannons", True, WHITE)
-        play1 = self.font.render("Press 1 Enter or Space for Level 1", True, GREEN)
-        play2 = self.font.render("Press 2 for Level 2", True, GREEN)
-        play3 = self.font.render("Press 3 for Level 3", True, GREEN)
-        info = self.font_small.render(
+        title = text_cache.render("Escape the Lava!", FONT_BIG, WHITE, bold=True)
+        sub = text_cache.render("Upward jumping with lava, saws, and cannons", FONT_MED, WHITE)
+        play1 = text_cache.render("Press 1 Enter or Space for Level 1", FONT_MED, GREEN)
+        play2 = text_cache.render("Press 2 for Level 2", FONT_MED, GREEN)
+        play3 = text_cache.render("Press 3 for Level 3", FONT_MED, GREEN)
+        endless = text_cache.render("Press E for Endless", FONT_MED, GREEN)
+        info = text_cache.render(
             "Reach the green door at the top. Avoid saws, cannons, and lava.",
-            True,
+            FONT_SMALL,
             WHITE,
         )
 
@@ -575,25 +2095,90 @@ class Game:
         self.screen.blit(play2, (WIDTH // 2 - play2.get_width() // 2, y))
         y += 40
         self.screen.blit(play3, (WIDTH // 2 - play3.get_width() // 2, y))
+        y += 40
+        self.screen.blit(endless, (WIDTH // 2 - endless.get_width() // 2, y))
         y += 80
         self.screen.blit(info, (WIDTH // 2 - info.get_width() // 2, y))
 
     def draw_dead(self):
         self.screen.fill((10, 0, 0))
-        txt = self.font_big.render("You Died", True, RED)
-        hint = self.font.render("Press Enter to return to Menu", True, WHITE)
+        txt = text_cache.render("You Died", FONT_BIG, RED, bold=True)
+        hint = text_cache.render("Press Enter to return to Menu", FONT_MED, WHITE)
         self.screen.blit(txt, (WIDTH // 2 - txt.get_width() // 2, HEIGHT // 2 - 60))
         self.screen.blit(hint, (WIDTH // 2 - hint.get_width() // 2, HEIGHT // 2 + 20))
 
     def draw_win(self):
         self.screen.fill((0, 18, 0))
-        txt = self.font_big.render("You Won", True, GREEN)
-        hint = self.font.render("Press Enter to return to Menu", True, WHITE)
+        txt = text_cache.render("You Won", FONT_BIG, GREEN, bold=True)
+        hint = text_cache.render("Press Enter to return to Menu", FONT_MED, WHITE)
         self.screen.blit(txt, (WIDTH // 2 - txt.get_width() // 2, HEIGHT // 2 - 60))
         self.screen.blit(hint, (WIDTH // 2 - hint.get_width() // 2, HEIGHT // 2 + 20))
 
 # ---------------------------------------
 # Main
 # ---------------------------------------
+def fast_forward(path):
+    replay = Replay.load(path)
+    sim = Simulation()
+    t0 = time.perf_counter()
+    checksum = sim.play(replay)
+    elapsed = max(time.perf_counter() - t0, 1e-9)
+    print(
+        f"{replay.ticks} ticks in {elapsed:.3f}s ({replay.ticks / elapsed:.0f} ticks/s), "
+        f"level {sim.level_idx + 1}, state {sim.state}, lives {sim.lives}"
+    )
+    if checksum != replay.checksum:
+        print(f"checksum mismatch: recorded {replay.checksum:08x}, replayed {checksum:08x}")
+        return 1
+    print(f"checksum {checksum:08x} ok")
+    return 0
+
 if __name__ == "__main__":
-    Game().run()
+    parser = argparse.ArgumentParser(description="Escape the Lava!")
+    parser.add_argument("--record", metavar="PATH", help="save each played session as a replay")
+    parser.add_argument("--replay", metavar="PATH", help="play back a recorded session")
+    parser.add_argument(
+        "--fast", action="store_true", help="with --replay, fast-forward headless and verify"
+    )
+    parser.add_argument(
+        "--profile", action="store_true", help="start with the profiler overlay on"
+    )
+    parser.add_argument(
+        "--fast-start",
+        action="store_true",
+        help="init only display and font, warm fonts and levels in the background",
+    )
+    parser.add_argument(
+        "--startup-time",
+        action="store_true",
+        help="print ms to the first presented frame (and to warm-up done) and exit",
+    )
+    parser.add_argument(
+        "--quality",
+        type=int,
+        choices=range(len(QUALITY_TIERS)),
+        help="pin a quality tier (0 is full detail) instead of adapting to frame time",
+    )
+    parser.add_argument(
+        "--fps", type=int, default=FPS, help=f"render rate, the simulation runs at {SIM_HZ} Hz"
+    )
+    args = parser.parse_args()
+    if args.replay and args.fast:
+        sys.exit(fast_forward(args.replay))
+    replay = Replay.load(args.replay) if args.replay else None
+    game = Game(
+        record_path=args.record,
+        replay=replay,
+        profile=args.profile,
+        fps=args.fps,
+        fast_start=args.fast_start,
+        quality_tier=args.quality,
+    )
+    if args.startup_time:
+        game.frame()
+        if game.warmup is not None:
+            game.warmup.join()
+        warm = game.first_frame_ms if game.warm_ms is None else game.warm_ms
+        print(f"first frame {game.first_frame_ms:.1f} ms, warm {warm:.1f} ms")
+        sys.exit(0)
+    game.run()
@@ -0,0 +1,145 @@
+import argparse
+import multiprocessing as mp
+import os
+import sys
+import time
+
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import pygame
+
+import main
+
+# ---------------------------------------
+# Offline renderer
+# ---------------------------------------
+# Renders a recorded session to a raw video stream or a PNG sequence without
+# a window. Frame k is the state after k ticks, drawn by Level.draw,
+# Player.draw and draw_hud onto an offscreen Surface. The requested frames are
+# split into contiguous ranges across a process pool; each worker
+# fast-forwards its own simulation to the start of its range, renders it and
+# writes every raw frame straight from the Surface's pixel buffer into its
+# slot of the output file.
+#
+# raw output plays with e.g.
+#   ffmpeg -f rawvideo -pix_fmt bgr0 -s 800x900 -r 60 -i session.raw session.mp4
+# (the pixel format for this machine is printed after rendering)
+
+def new_surface():
+    return pygame.Surface((main.WIDTH, main.HEIGHT))
+
+def pixel_format(surf):
+    # byte order of a 32-bit surface in memory, as ffmpeg names it
+    if surf.get_bitsize() != 32 or surf.get_pitch() != 4 * surf.get_width():
+        raise RuntimeError("raw output needs an unpadded 32-bit surface")
+    order = {shift: name for name, shift in zip("rgb", surf.get_shifts()[:3])}
+    if sys.byteorder == "little":
+        return "".join(order.get(s, "0") for s in (0, 8, 16, 24))
+    return "".join(order.get(s, "0") for s in (24, 16, 8, 0))
+
+def draw_frame(surf, sim):
+    sim.level.draw(surf, sim.cam_y)
+    sim.player.draw(surf, sim.cam_y)
+    main.draw_hud(surf, sim)
+
+def render_range(task):
+    path, frames, first_slot, out, fmt = task
+    pygame.font.init()
+    replay = main.Replay.load(path)
+    sim = main.Simulation(level_cache=main.LEVEL_CACHE_DIR)
+    sim.start_level(replay.level_idx, replay.seed)
+    ticks = iter(replay)
+    tick = 0
+
+    t0 = time.perf_counter()
+    while tick < frames[0]:
+        inputs, dt = next(ticks)
+        sim.step(inputs, dt)
+        tick += 1
+    ff = time.perf_counter() - t0
+
+    surf = new_surface()
+    frame_bytes = surf.get_pitch() * surf.get_height()
+    rendered = None
+    f = open(out, "r+b") if fmt == "raw" else None
+    try:
+        if f is not None:
+            f.seek(first_slot * frame_bytes)
+        for j, k in enumerate(frames):
+            while tick < k:
+                inputs, dt = next(ticks)
+                sim.step(inputs, dt)
+                tick += 1
+            if sim.level is not rendered:
+                sim.level.prepare_render()
+                rendered = sim.level
+            draw_frame(surf, sim)
+            if f is not None:
+                # the buffer proxy exposes the pixels in place, no copy
+                f.write(surf.get_buffer())
+            else:
+                pygame.image.save(surf, os.path.join(out, f"frame_{first_slot + j:06d}.png"))
+    finally:
+        if f is not None:
+            f.close()
+    return len(frames), ff, time.perf_counter() - t0 - ff
+
+def split(frames, parts):
+    bounds = [len(frames) * k // parts for k in range(parts + 1)]
+    return [(frames[a:b], a) for a, b in zip(bounds, bounds[1:]) if a < b]
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Render a replay offline")
+    parser.add_argument("replay")
+    parser.add_argument("--out", required=True, help="raw video file, or a directory for png")
+    parser.add_argument("--format", choices=("raw", "png"), default="raw")
+    parser.add_argument("--start", type=int, default=0, help="first tick to render")
+    parser.add_argument("--end", type=int, help="last tick to render (default: the end)")
+    parser.add_argument("--every", type=int, default=1, help="render every Nth tick")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    replay = main.Replay.load(args.replay)
+    end = replay.ticks if args.end is None else min(args.end, replay.ticks)
+    frames = list(range(args.start, end + 1, max(1, args.every)))
+    if not frames:
+        parser.error("no frames in range")
+
+    surf = new_surface()
+    if args.format == "raw":
+        pix_fmt = pixel_format(surf)
+        with open(args.out, "wb") as f:
+            f.truncate(len(frames) * surf.get_pitch() * surf.get_height())
+    else:
+        os.makedirs(args.out, exist_ok=True)
+    del surf
+
+    workers = max(1, min(args.workers, len(frames)))
+    tasks = [
+        (args.replay, chunk, slot, args.out, args.format) for chunk, slot in split(frames, workers)
+    ]
+    t0 = time.perf_counter()
+    if workers > 1:
+        methods = mp.get_all_start_methods()
+        ctx = mp.get_context("fork" if "fork" in methods else None)
+        with ctx.Pool(workers) as pool:
+            results = pool.map(render_range, tasks)
+    else:
+        results = [render_range(t) for t in tasks]
+    elapsed = time.perf_counter() - t0
+
+    rendered = sum(r[0] for r in results)
+    ff = max(r[1] for r in results)
+    print(
+        f"{rendered} frames in {elapsed:.2f}s ({rendered / elapsed:.1f} frames/s) "
+        f"with {workers} workers, longest fast-forward {ff:.2f}s"
+    )
+    if args.format == "raw":
+        rate = main.SIM_HZ / max(1, args.every)
+        print(
+            f"ffmpeg -f rawvideo -pix_fmt {pix_fmt} -s {main.WIDTH}x{main.HEIGHT} "
+            f"-r {rate:g} -i {args.out} out.mp4"
+        )
+
+if __name__ == "__main__":
+    main_cli()
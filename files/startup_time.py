@@ -0,0 +1,50 @@
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+# ---------------------------------------
+# Startup time
+# ---------------------------------------
+# Launches the game in a fresh process several times, with and without
+# --fast-start, and reports the ms from import to the first presented frame
+# and to the end of warm-up (fonts, level files and saw sprites loaded).
+
+MAIN = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+PATTERN = re.compile(r"first frame ([\d.]+) ms, warm ([\d.]+) ms")
+
+def launch(fast_start):
+    cmd = [sys.executable, MAIN, "--startup-time"]
+    if fast_start:
+        cmd.append("--fast-start")
+    out = subprocess.run(cmd, capture_output=True, text=True, check=True).stdout
+    match = PATTERN.search(out)
+    if match is None:
+        raise RuntimeError(f"unexpected output from {' '.join(cmd)}: {out!r}")
+    return float(match.group(1)), float(match.group(2))
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Measure ms to the first presented frame")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    modes = (("full", False), ("fast", True))
+    # interleaved so drift in machine load hits both modes alike
+    results = {label: [] for label, _ in modes}
+    for _ in range(args.runs):
+        for label, fast_start in modes:
+            results[label].append(launch(fast_start))
+
+    print(f"{'mode':<8}{'first frame':>14}{'warm':>10}{'best':>10}")
+    for label, runs in results.items():
+        first = [r[0] for r in runs]
+        warm = [r[1] for r in runs]
+        print(f"{label:<8}{median(first):>11.1f} ms{median(warm):>7.1f} ms{min(first):>7.1f} ms")
+
+if __name__ == "__main__":
+    main_cli()
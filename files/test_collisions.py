@@ -0,0 +1,112 @@
+import os
+
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import pygame
+import pytest
+
+import main
+
+# ---------------------------------------
+# Swept collisions
+# ---------------------------------------
+# Steps far longer than a platform is thick must still land on it, hazards
+# must hit when their path crosses the player between two ticks, and paths
+# that only come close must not.
+
+def falling_onto_platform(gap, vely):
+    # a player whose bottom is `gap` px above a mid-level platform, falling
+    sim = main.Simulation()
+    sim.start_level(0)
+    plat = sorted(sim.level.platforms, key=lambda q: q.rect.top)[5]
+    p = sim.player
+    p.rect.midbottom = (plat.rect.centerx, plat.rect.top - gap)
+    p.vely = vely
+    p.on_ground = False
+    # keep hazards and the lava from respawning the player mid-test
+    p.invuln_timer = 60.0
+    sim.level.lava_y = sim.level.height + 1000
+    return sim, plat
+
+def test_fast_fall_lands():
+    # 30 px in one tick carries the rect clean past a 20 px platform
+    sim, plat = falling_onto_platform(5, 30)
+    sim.step(main.Inputs())
+    assert sim.player.rect.bottom == plat.rect.top
+    assert sim.player.on_ground
+
+@pytest.mark.parametrize("ticks", (2, 4, 8))
+def test_coarse_step_lands(ticks):
+    sim, plat = falling_onto_platform(40, 30)
+    sim.step(main.Inputs(), main.SIM_DT * ticks)
+    assert sim.player.rect.bottom == plat.rect.top
+    assert sim.player.on_ground
+
+def jump_height(ticks):
+    sim = main.Simulation()
+    sim.start_level(0)
+    sim.level.lava_y = sim.level.height + 1000
+    for _ in range(30):
+        sim.step(main.Inputs())
+    ground = sim.player.rect.y
+    top = ground
+    inputs = main.Inputs(jump_pressed=True)
+    for _ in range(48 // ticks):
+        sim.step(inputs, main.SIM_DT * ticks)
+        inputs = main.Inputs()
+        top = min(top, sim.player.rect.y)
+    return ground - top, sim.player.rect.y == ground
+
+@pytest.mark.parametrize("ticks", (2, 4))
+def test_coarse_step_jump(ticks):
+    # a coarse jump rises about as high as tick by tick and comes back down
+    # to the same ground instead of snapping onto a platform overhead
+    fine, _ = jump_height(1)
+    coarse, landed = jump_height(ticks)
+    assert fine == 124
+    assert abs(coarse - fine) <= 8
+    assert landed
+
+def test_moving_saw_graze():
+    # the saw sweeps across the player within one tick, clear at both ends
+    saw = main.MovingSaw(100, 525, 700, 525, r=22, speed=9000)
+    saw.px, saw.py = 300, 525
+    saw.x, saw.y = 460, 525
+    rect = pygame.Rect(380, 500, main.PLAYER_W, main.PLAYER_H)
+    assert not saw.collides(rect)
+    assert not main.circle_rect_collision(saw.px, saw.py, saw.r - 2, rect)
+    assert saw.collides_swept(rect)
+
+def test_moving_saw_graze_while_moving():
+    # the saw stands still at the end; the player runs through it and out
+    saw = main.MovingSaw(100, 525, 700, 525, r=22)
+    saw.px, saw.py = saw.x, saw.y = 400, 525
+    start = pygame.Rect(330, 500, main.PLAYER_W, main.PLAYER_H)
+    end = start.move(110, 0)
+    assert not saw.collides(start) and not saw.collides(end)
+    assert saw.collides_swept(end, end.x - start.x, end.y - start.y)
+
+def test_diagonal_corner_miss():
+    # the saw sits in the empty corner of the box spanning a diagonal step
+    saw = main.Saw(330, 440, 22)
+    start = pygame.Rect(300, 400, main.PLAYER_W, main.PLAYER_H)
+    end = pygame.Rect(340, 360, main.PLAYER_W, main.PLAYER_H)
+    assert start.union(end).collidepoint(saw.x, saw.y)
+    assert not saw.collides_swept(end, 40, -40)
+
+def test_shot_alongside_player():
+    # shot and player move left together with a 4-5 px gap: no hit
+    pool = main.ProjectilePool()
+    pool.spawn(300, 525, -240, 0, 10)
+    pool.update(main.SIM_DT)
+    assert (pool.px[0], pool.x[0]) == (300, 296)
+    end = pygame.Rect(309, 500, main.PLAYER_W, main.PLAYER_H)
+    assert not pool.collides_swept(end, -5, 0)
+
+def test_shot_through_falling_player():
+    # a fast shot crosses the column a fast fall passes through
+    pool = main.ProjectilePool()
+    pool.spawn(250, 300, 0, 0, 8)
+    pool.x[0] = 550
+    end = pygame.Rect(380, 320, main.PLAYER_W, main.PLAYER_H)
+    assert pool.collides_swept(end, 0, 100)
@@ -0,0 +1,83 @@
+import os
+import struct
+
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import pytest
+
+import main
+
+# ---------------------------------------
+# Compiled level files
+# ---------------------------------------
+# Level.save -> Level.load must give back the generated level exactly, and a
+# file that is truncated, from another format version or for another level
+# must load as None so Level.cached rebuilds it.
+
+def contents(lvl):
+    return {
+        "platforms": [tuple(p.rect) for p in lvl.platforms],
+        "saws": [(s.x, s.y, s.r) for s in lvl.saws],
+        "moving_saws": [(ms.ax, ms.ay, ms.bx, ms.by, ms.r, ms.speed) for ms in lvl.moving_saws],
+        "cannons": [
+            (c.x, c.y, c.dir, c.cooldown, c.speed, c.radius, c.timer) for c in lvl.cannons
+        ],
+        "door": tuple(lvl.door.rect),
+        "spawn": tuple(lvl.spawn),
+        "height": lvl.height,
+        "lava": (lvl.lava_y, lvl.lava_speed),
+    }
+
+@pytest.fixture
+def saved(tmp_path):
+    lvl = main.Level(1)
+    path = str(tmp_path / "level.bin")
+    lvl.save(path)
+    return lvl, path
+
+@pytest.mark.parametrize("idx", range(main.LEVEL_COUNT))
+def test_round_trip(tmp_path, idx):
+    lvl = main.Level(idx)
+    path = str(tmp_path / f"level_{idx}.bin")
+    lvl.save(path)
+    loaded = main.Level.load(path, idx, lvl.seed)
+    assert loaded is not None
+    assert (loaded.idx, loaded.seed) == (idx, lvl.seed)
+    assert contents(loaded) == contents(lvl)
+    assert loaded.top_y == lvl.top_y
+
+def test_truncated(saved):
+    lvl, path = saved
+    with open(path, "rb") as f:
+        data = f.read()
+    for size in (0, main.Level.HEADER.size - 1, len(data) // 2, len(data) - 1):
+        with open(path, "wb") as f:
+            f.write(data[:size])
+        assert main.Level.load(path, lvl.idx, lvl.seed) is None
+
+def test_version_mismatch(saved):
+    lvl, path = saved
+    with open(path, "r+b") as f:
+        f.seek(4)
+        f.write(struct.pack("<H", main.LEVEL_FORMAT_VERSION + 1))
+    assert main.Level.load(path, lvl.idx, lvl.seed) is None
+
+def test_other_level(saved):
+    lvl, path = saved
+    assert main.Level.load(path, lvl.idx + 1, lvl.seed) is None
+    assert main.Level.load(path, lvl.idx, lvl.seed + 1) is None
+    assert main.Level.load(path) is not None
+
+def test_missing(tmp_path):
+    assert main.Level.load(str(tmp_path / "nope.bin")) is None
+
+def test_cached_rebuilds_bad_file(tmp_path):
+    cache = str(tmp_path)
+    first = main.Level.cached(2, cache)
+    path = os.path.join(cache, f"level_2_{first.seed}.bin")
+    assert os.path.exists(path)
+    with open(path, "r+b") as f:
+        f.truncate(40)
+    again = main.Level.cached(2, cache)
+    assert contents(again) == contents(first)
+    assert main.Level.load(path, 2, first.seed) is not None
@@ -0,0 +1,38 @@
+import os
+import threading
+
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import main
+
+# ---------------------------------------
+# Level prefetch
+# ---------------------------------------
+# The next level is built on a worker thread and handed over at the door. If
+# the worker fails, the door must still lead to a freshly built level.
+
+def test_prefetched_level_is_used():
+    sim = main.Simulation(prefetch=True)
+    sim.start_level(0)
+    pending = sim.pending
+    assert pending.key == (1, None)
+    sim.start_level(1)
+    assert sim.level is pending.level
+    assert sim.state == main.STATE_PLAY
+
+def test_failed_prefetch_builds_level(monkeypatch):
+    prepare = main.Level.prepare_render
+
+    def failing(lvl):
+        if threading.current_thread().name.startswith("prefetch"):
+            raise MemoryError
+        prepare(lvl)
+
+    monkeypatch.setattr(main.Level, "prepare_render", failing)
+    sim = main.Simulation(prefetch=True)
+    sim.start_level(0)
+    assert sim.pending.take() is None
+    sim.start_level(1)
+    assert sim.level.idx == 1
+    assert sim.player.rect.topleft == sim.level.spawn
+    assert sim.state == main.STATE_PLAY
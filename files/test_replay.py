@@ -0,0 +1,83 @@
+import os
+import random
+import struct
+
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pytest
+
+import main
+
+# ---------------------------------------
+# Replays
+# ---------------------------------------
+# A recorded session must replay to the recorded checksum headless and in the
+# game at any render rate, since the simulation only ever takes fixed ticks.
+
+# sessions end on their own well before this
+MAX_TICKS = 20000
+
+class FixedClock:
+    # stands in for pygame's Clock: every frame takes exactly `ms`
+    def __init__(self, ms):
+        self.ms = ms
+
+    def tick(self, fps=0):
+        return self.ms
+
+    def get_rawtime(self):
+        return self.ms
+
+@pytest.fixture(scope="module")
+def session(tmp_path_factory):
+    rng = random.Random(5)
+    sim = main.Simulation()
+    sim.start_level(1)
+    replay = main.Replay(1, sim.level.seed)
+    while sim.state == main.STATE_PLAY and replay.ticks < MAX_TICKS:
+        inputs = main.Inputs(
+            rng.random() < 0.4, rng.random() < 0.5, rng.random() < 0.2, rng.random() < 0.1
+        )
+        replay.record(inputs)
+        sim.step(inputs)
+    assert sim.state != main.STATE_PLAY
+    replay.checksum = sim.checksum()
+    path = str(tmp_path_factory.mktemp("replay") / "session.rep")
+    replay.save(path)
+    return path, replay
+
+def test_save_load(session):
+    path, replay = session
+    loaded = main.Replay.load(path)
+    assert (loaded.level_idx, loaded.seed, loaded.hz) == (replay.level_idx, replay.seed, replay.hz)
+    assert (loaded.ticks, loaded.checksum) == (replay.ticks, replay.checksum)
+    assert loaded.runs == replay.runs
+
+def test_fast_forward(session):
+    path, replay = session
+    assert main.Simulation().play(main.Replay.load(path)) == replay.checksum
+    assert main.fast_forward(path) == 0
+
+@pytest.mark.parametrize("frame_ms", (7, 16, 33, 90))
+def test_render_rate(session, frame_ms):
+    path, replay = session
+    game = main.Game(replay=main.Replay.load(path))
+    game.clock = FixedClock(frame_ms)
+    for _ in range(4 * MAX_TICKS):
+        if game.sim.state != main.STATE_PLAY:
+            break
+        game.frame()
+    assert game.sim.state != main.STATE_PLAY
+    assert game.sim.checksum() == replay.checksum
+
+def test_other_tick_rate(session, tmp_path):
+    path, replay = session
+    with open(path, "rb") as f:
+        data = bytearray(f.read())
+    # hz follows magic, version, level and seed in the header
+    struct.pack_into("<H", data, 16, main.SIM_HZ // 2)
+    other = tmp_path / "other.rep"
+    other.write_bytes(bytes(data))
+    with pytest.raises(ValueError):
+        main.Replay.load(str(other))
@@ -0,0 +1,77 @@
+import os
+import random
+
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import pytest
+
+import main
+
+# ---------------------------------------
+# Snapshots
+# ---------------------------------------
+# Restoring a snapshot and running on from it must end exactly where a fresh
+# run with the same inputs ends, however often the snapshot is reused. Lives
+# are topped up and the lava slowed so the runs cover the whole level; in
+# endless mode the player is lifted every tick so new chunks stream in and
+# old ones are evicted after the snapshot.
+
+LEVELS = (0, 1, 2, main.ENDLESS_LEVEL)
+
+def script(seed, n):
+    rng = random.Random(seed)
+    return [
+        main.Inputs(rng.random() < 0.4, rng.random() < 0.5, rng.random() < 0.2, rng.random() < 0.1)
+        for _ in range(n)
+    ]
+
+def start(idx):
+    sim = main.Simulation()
+    sim.start_level(idx)
+    sim.level.lava_accel = 1.0
+    sim.level.lava_speed = 5
+    return sim
+
+def run(sim, inputs):
+    endless = isinstance(sim.level, main.EndlessLevel)
+    for inp in inputs:
+        sim.step(inp)
+        sim.lives = 99
+        if endless:
+            sim.player.rect.y -= 4
+
+def geometry(lvl):
+    return (
+        [tuple(p.rect) for p in lvl.platforms],
+        [(s.x, s.y, s.r) for s in lvl.saws],
+        [(ms.ax, ms.ay, ms.bx, ms.by) for ms in lvl.moving_saws],
+        [(c.x, c.y, c.timer) for c in lvl.cannons],
+    )
+
+@pytest.mark.parametrize("idx", LEVELS)
+def test_restore_matches_fresh_run(idx):
+    before, after = script(1, 300), script(2, 2000)
+    fresh = start(idx)
+    run(fresh, before)
+    run(fresh, after)
+
+    sim = start(idx)
+    run(sim, before)
+    snap = sim.snapshot()
+    for _ in range(3):
+        sim.restore(snap)
+        run(sim, after)
+        assert sim.checksum() == fresh.checksum()
+        assert sim.level.projectiles.n == fresh.level.projectiles.n
+        assert sim.level.height == fresh.level.height
+        assert geometry(sim.level) == geometry(fresh.level)
+
+def test_restore_into_new_simulation():
+    sim = start(1)
+    run(sim, script(1, 300))
+    snap = sim.snapshot()
+    expected = sim.checksum()
+    run(sim, script(2, 200))
+    other = main.Simulation()
+    other.restore(snap)
+    assert other.checksum() == expected